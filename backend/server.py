@@ -1,27 +1,47 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Query, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials, HTTPBearer
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteMany, IndexModel, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import Binary
 import os
 import logging
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager, contextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Set, Tuple, Iterable, Iterator, AsyncIterator, Callable, BinaryIO
+from collections import Counter, OrderedDict
 import uuid
 from datetime import datetime, timedelta
-import pandas as pd
+import numpy as np
 import io
 import secrets
-from passlib.context import CryptContext
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-import xlsxwriter
+import csv
+import tempfile
+import hashlib
+import base64
+import re
+import codecs
+import bcrypt
+import jwt
+from xml.sax.saxutils import escape
+import importlib
 import json
+import orjson
+
+# Parsers and exporters are imported where they are first used so a worker starts serving sooner
+if TYPE_CHECKING:
+    import pandas as pd
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,13 +51,151 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Security
-security = HTTPBasic()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Rollup rebuilds write a side collection that is renamed over the live one when complete
+ROLLUP_REBUILD_COLLECTION = "engagement_rollups_rebuild"
+ROLLUP_REBUILD_LOCK_TTL = timedelta(hours=1)
+ROLLUP_REBUILD_ATTEMPTS = 3
+# How long a rebuild waits for the rollup diffs already in flight to finish
+ROLLUP_DIFF_WAIT_SECONDS = 30
+
+# Background upload jobs
+UPLOAD_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+UPLOAD_JOB_TTL = timedelta(hours=int(os.environ.get('UPLOAD_JOB_TTL_HOURS', '6')))
+UPLOAD_JOB_POLL_INTERVAL = 0.5
+UPLOAD_JOB_KEEPALIVE_INTERVAL = 15
+
+# Indexes ensured on startup, keyed by collection name
+INDEX_SPECS = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Keyset order of the user listing within a platform's active roster version, and over all
+        # platforms; an anchored username prefix is a range scan on either index
+        IndexModel([("platform", ASCENDING), ("upload_version", ASCENDING), ("username", ASCENDING), ("id", ASCENDING)], name="platform_upload_version_username_id"),
+        IndexModel([("username", ASCENDING), ("id", ASCENDING)], name="username_id"),
+    ],
+    "posts": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("platform", ASCENDING), ("post_date", ASCENDING)], name="platform_post_date"),
+    ],
+    "engagements": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("post_id", ASCENDING), ("upload_version", ASCENDING), ("username", ASCENDING)], name="post_id_upload_version_username"),
+    ],
+    "post_engagers": [
+        IndexModel([("post_id", ASCENDING), ("upload_version", ASCENDING)], name="post_id_upload_version", unique=True),
+    ],
+    "usernames": [
+        IndexModel([("uid", ASCENDING)], name="uid_unique", unique=True),
+    ],
+    "admins": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "engagement_rollups": [
+        IndexModel([("platform", ASCENDING), ("day", ASCENDING), ("username", ASCENDING)], name="platform_day_username", unique=True),
+        IndexModel([("day", ASCENDING)], name="day"),
+    ],
+    "rollup_diffs": [
+        # Markers left behind by a worker that died mid-diff expire with the rebuild lock
+        IndexModel([("started_at", ASCENDING)], name="started_at_ttl", expireAfterSeconds=int(ROLLUP_REBUILD_LOCK_TTL.total_seconds())),
+    ],
+    "upload_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Jobs of any phase go once they have not moved for the TTL, including ones a restart cut short
+        IndexModel([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=int(UPLOAD_JOB_TTL.total_seconds())),
+    ],
+}
+
+# Indexes replaced by the ones above; dropped on startup so existing databases stop maintaining them
+SUPERSEDED_INDEXES = {
+    "users": ["platform_username", "platform_username_id"],
+    "engagements": ["post_id_username"],
+}
+
+# Documents fetched per round trip when streaming a platform roster
+ROSTER_BATCH_SIZE = 5000
+
+# Number of post analyses kept in memory
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '128'))
+
+# Usernames looked up per query when interning or decoding packed engager ids
+USERNAME_LOOKUP_CHUNK_SIZE = 10000
+# Username/id pairs kept in memory per worker; the rest are looked up again when needed
+USERNAME_CACHE_SIZE = int(os.environ.get('USERNAME_CACHE_SIZE', '200000'))
+
+# Upload parsing
+UPLOAD_BATCH_SIZE = int(os.environ.get('UPLOAD_BATCH_SIZE', '5000'))
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024
+CSV_ENCODINGS = ['utf-8', 'utf-8-sig', 'latin1', 'cp1252']
+USERNAME_COLUMNS = ['username', 'kullanici_adi', 'kullanıcı_adı', 'user', 'name', 'isim']
+# Cell texts pandas reads as missing by default; the streaming Excel reader skips them the same way
+EXCEL_NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+# Parsing runs on its own thread pool; uploads beyond the concurrency limit wait for a free slot
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', '2'))
+PARSE_MAX_CONCURRENT_UPLOADS = int(os.environ.get('PARSE_MAX_CONCURRENT_UPLOADS', str(PARSE_WORKERS)))
+
+# Staged engagement rows that never became active are collected once they are this old
+ENGAGEMENT_STAGING_GRACE = timedelta(hours=int(os.environ.get('ENGAGEMENT_STAGING_GRACE_HOURS', '24')))
+# Same for staged roster rows of replace uploads that never became a platform's active roster
+ROSTER_STAGING_GRACE = timedelta(hours=int(os.environ.get('ROSTER_STAGING_GRACE_HOURS', '24')))
+# Times a sync upload recomputes its diff when replace uploads keep changing the active roster
+ROSTER_SYNC_ATTEMPTS = 3
+# Roster version the users stored before rosters were versioned are adopted into
+LEGACY_ROSTER_VERSION = "legacy"
+
+# Export rendering runs on its own thread pool
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+EXPORT_ROW_BATCH_SIZE = 2000
+EXPORT_FORMATS = ["csv", "xlsx"]
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_MEDIA_TYPES = {"pdf": "application/pdf", "csv": "text/csv; charset=utf-8", "xlsx": XLSX_MEDIA_TYPE}
+EXPORT_CACHE_DIR = Path(os.environ.get('EXPORT_CACHE_DIR', str(Path(tempfile.gettempdir()) / 'veri1-exports')))
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_MB', '256')) * 1024 * 1024
+# Unfinished renders older than this were left by a worker that died and are swept on startup
+EXPORT_CACHE_TEMPORARY_GRACE = timedelta(hours=1)
+PDF_USER_TABLE_ROWS = 35
+PDF_USER_TABLE_COLUMNS = 3
+
+# Optional warm-up after startup: open a Mongo connection and load the lazily imported modules
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes')
+WARMUP_MODULES = ["pandas", "openpyxl", "xlsxwriter", "reportlab.platypus", "reportlab.lib.styles"]
 
-# Admin credentials (in production, store in database with hashed passwords)
-ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD = "admin123"  # This should be hashed in production
+# Latency histogram buckets (seconds) for requests and for the stages inside them
+METRICS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# List endpoints answer as one JSON document or as newline-delimited rows streamed from the cursor
+RESPONSE_FORMATS = ["json", "ndjson"]
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 1000
+
+# Username normalization patterns, compiled once and shared by the scalar and column normalizers
+USERNAME_SEPARATOR_PATTERN = re.compile(r'[\s\._\-]+')
+USERNAME_INVALID_PATTERN = re.compile(r'[^a-z0-9]')
+
+# Security: /login trades Basic credentials for a short-lived signed token, every other route requires the token
+security = HTTPBasic(auto_error=False)
+bearer_security = HTTPBearer(auto_error=False)
+
+# Signing key shared by all workers: JWT_SECRET, or else a key generated once and kept in MongoDB
+JWT_SECRET: Optional[str] = os.environ.get('JWT_SECRET')
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_TTL_MINUTES', '60')))
+
+# Checked when the username is unknown so a failed login costs one bcrypt round either way
+UNKNOWN_ADMIN_PASSWORD_HASH = "$2b$12$F99us5OF6GhpR1MxmrYwZu9JWISuh8wQJDVoe57EZFbZCLv5qICtu"
+
+# Static token Prometheus sends as a Bearer credential on /api/metrics; the endpoint is open when unset
+METRICS_TOKEN: Optional[str] = os.environ.get('METRICS_TOKEN')
+
+# Seed account stored (hashed) in the admins collection when it is empty
+ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 
 # Create the main app without a prefix
 app = FastAPI(title="AK Parti Niğde Gençlik Kolları | SMT Sistemi")
@@ -45,6 +203,168 @@ app = FastAPI(title="AK Parti Niğde Gençlik Kolları | SMT Sistemi")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+class ParsePool:
+    """Bounded thread pool for blocking pandas/openpyxl work, with queue-depth counters.
+    
+    The streaming parser keeps the spooled upload file open between batches, so the
+    work is run on threads rather than processes; the event loop stays free either way.
+    """
+    
+    def __init__(self, max_workers: int, max_concurrent_uploads: int):
+        self.max_workers = max_workers
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-parse")
+        self.slots = asyncio.Semaphore(max_concurrent_uploads)
+        self.waiting_uploads = 0
+        self.active_uploads = 0
+        self.completed_uploads = 0
+        self.pending_tasks = 0
+    
+    @asynccontextmanager
+    async def upload_slot(self):
+        self.waiting_uploads += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting_uploads -= 1
+        
+        self.active_uploads += 1
+        try:
+            yield
+        finally:
+            self.active_uploads -= 1
+            self.completed_uploads += 1
+            self.slots.release()
+    
+    async def run(self, func: Callable, *args):
+        self.pending_tasks += 1
+        try:
+            # Worker threads record stage timings into the calling request's context
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, func, *args)
+        finally:
+            self.pending_tasks -= 1
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrent_uploads": self.max_concurrent_uploads,
+            "waiting_uploads": self.waiting_uploads,
+            "active_uploads": self.active_uploads,
+            "completed_uploads": self.completed_uploads,
+            "pending_tasks": self.pending_tasks
+        }
+
+parse_pool = ParsePool(PARSE_WORKERS, PARSE_MAX_CONCURRENT_UPLOADS)
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export-render")
+
+class UsernameDictionary:
+    """Maps normalized usernames to dense integer ids stored in the usernames collection.
+    
+    An id never changes once assigned, so recently used pairs are cached in memory in both
+    directions and only the others go to Mongo. Engagement exports list any public account,
+    so the cache is an LRU bounded by max_entries rather than a record of every username seen.
+    """
+    
+    def __init__(self, max_entries: int = USERNAME_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.uid_by_username: "OrderedDict[str, int]" = OrderedDict()
+        self.username_by_uid: Dict[int, str] = {}
+    
+    def _remember(self, username: str, uid: int):
+        self.uid_by_username[username] = uid
+        self.uid_by_username.move_to_end(username)
+        self.username_by_uid[uid] = username
+        while len(self.uid_by_username) > self.max_entries:
+            _, evicted_uid = self.uid_by_username.popitem(last=False)
+            del self.username_by_uid[evicted_uid]
+    
+    def _cached_uids(self, usernames: Iterable[str]) -> Dict[str, int]:
+        found = {}
+        for username in usernames:
+            uid = self.uid_by_username.get(username)
+            if uid is not None:
+                self.uid_by_username.move_to_end(username)
+                found[username] = uid
+        return found
+    
+    async def _load(self, query_field: str, values: List[Any]) -> Dict[str, int]:
+        """Fetch the pairs matching the values; the caller keeps them, as the cache may not"""
+        found = {}
+        for start in range(0, len(values), USERNAME_LOOKUP_CHUNK_SIZE):
+            chunk = values[start:start + USERNAME_LOOKUP_CHUNK_SIZE]
+            async for entry in db.usernames.find({query_field: {"$in": chunk}}):
+                found[entry["_id"]] = entry["uid"]
+                self._remember(entry["_id"], entry["uid"])
+        return found
+    
+    async def _assign(self, usernames: List[str]) -> Dict[str, int]:
+        counter = await db.counters.find_one_and_update(
+            {"_id": "username_uid"},
+            {"$inc": {"seq": len(usernames)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first_uid = counter["seq"] - len(usernames) + 1
+        entries = [{"_id": username, "uid": first_uid + offset} for offset, username in enumerate(usernames)]
+        
+        try:
+            await db.usernames.insert_many(entries, ordered=False)
+        except BulkWriteError:
+            # Another worker interned some of these first; its ids win
+            return await self._load("_id", usernames)
+        
+        for entry in entries:
+            self._remember(entry["_id"], entry["uid"])
+        return {entry["_id"]: entry["uid"] for entry in entries}
+    
+    async def intern(self, usernames: List[str]) -> np.ndarray:
+        """Return the id of every username, assigning ids to the ones seen for the first time"""
+        distinct = list(dict.fromkeys(usernames))
+        uids = self._cached_uids(distinct)
+        missing = [username for username in distinct if username not in uids]
+        if missing:
+            uids.update(await self._load("_id", missing))
+            missing = [username for username in missing if username not in uids]
+        if missing:
+            uids.update(await self._assign(missing))
+        
+        return np.fromiter((uids[username] for username in usernames), dtype=np.uint32, count=len(usernames))
+    
+    async def lookup(self, usernames: List[str]) -> np.ndarray:
+        """Return the id of every username without assigning new ids; unknown usernames get -1"""
+        distinct = list(dict.fromkeys(usernames))
+        uids = self._cached_uids(distinct)
+        missing = [username for username in distinct if username not in uids]
+        if missing:
+            uids.update(await self._load("_id", missing))
+        return np.fromiter((uids.get(username, -1) for username in usernames), dtype=np.int64, count=len(usernames))
+    
+    async def usernames(self, uids: Iterable[int]) -> Dict[int, str]:
+        """Decode ids back to usernames"""
+        uids = [int(uid) for uid in uids]
+        found = {}
+        missing = []
+        for uid in uids:
+            username = self.username_by_uid.get(uid)
+            if username is None:
+                missing.append(uid)
+            else:
+                self.uid_by_username.move_to_end(username)
+                found[uid] = username
+        if missing:
+            found.update({uid: username for username, uid in (await self._load("uid", missing)).items()})
+        return found
+
+username_dictionary = UsernameDictionary()
+
+def pack_uids(uids: np.ndarray) -> Binary:
+    """Pack a sorted id array as little-endian uint32 bytes"""
+    return Binary(uids.astype('<u4').tobytes())
+
+def unpack_uids(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype='<u4')
+
 # Models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -64,6 +384,10 @@ class Post(BaseModel):
     post_date: datetime
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Trusted read path: documents written through the models above are returned as projected, without re-validation
+USER_PROJECTION = {"_id": 0, **{field: 1 for field in User.model_fields}}
+POST_FIELDS = list(Post.model_fields)
+
 class PostCreate(BaseModel):
     title: str
     platform: str
@@ -77,21 +401,361 @@ class Engagement(BaseModel):
     platform: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class EngagementAnalysis(BaseModel):
+class UploadJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: str  # "users", "engagements" or "migration"
+    phase: str = "queued"  # queued, parsing, replacing, migrating, completed or failed
+    rows_parsed: int = 0
+    rows_inserted: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    async def advance(self, **changes):
+        """Apply the changes and store them, so status requests to any worker see them"""
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.updated_at = datetime.utcnow()
+        await db.upload_jobs.update_one({"id": self.id}, {"$set": {**changes, "updated_at": self.updated_at}})
+    
+    @property
+    def finished(self) -> bool:
+        return self.phase in ("completed", "failed")
+
+class EngagementAnalysisSummary(BaseModel):
     post_id: str
     post_title: str
     platform: str
     total_management: int
     total_engaged: int
     engagement_percentage: float
+
+class EngagementAnalysis(EngagementAnalysisSummary):
     engaged_users: List[str]
     not_engaged_users: List[str]
 
-# Auth function
-def authenticate_admin(credentials: HTTPBasicCredentials = Depends(security)):
-    is_correct_username = secrets.compare_digest(credentials.username, ADMIN_USERNAME)
-    is_correct_password = secrets.compare_digest(credentials.password, ADMIN_PASSWORD)
-    if not (is_correct_username and is_correct_password):
+class Admin(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    username: str
+    password_hash: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AdminCreate(BaseModel):
+    username: str
+    password: str
+
+class BatchAnalysisRequest(BaseModel):
+    post_ids: List[str]
+    summary_only: bool = False
+
+class AnalysisCache:
+    """LRU cache of post analyses keyed by post and by the data version they were computed from.
+    
+    A key embeds the post's engagement version and the platform's roster version, so
+    entries of other workers go stale by themselves; invalidation frees memory early.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, EngagementAnalysis]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: tuple) -> Optional[EngagementAnalysis]:
+        analysis = self.entries.get(key)
+        if analysis is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return analysis
+    
+    def put(self, key: tuple, analysis: EngagementAnalysis):
+        self.entries[key] = analysis
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+    
+    def _invalidate(self, matches: Callable[[tuple], bool]):
+        for key in [key for key in self.entries if matches(key)]:
+            del self.entries[key]
+            self.invalidations += 1
+    
+    def invalidate_post(self, post_id: str):
+        self._invalidate(lambda key: key[0] == post_id)
+    
+    def invalidate_platform(self, platform: str):
+        self._invalidate(lambda key: key[1] == platform)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+analysis_cache = AnalysisCache(ANALYSIS_CACHE_SIZE)
+
+class ExportArtifactCache:
+    """Size-bounded LRU cache of rendered export files on local disk.
+    
+    A file name carries the post id and a digest of the export format and the data version
+    it was rendered from, so the digest doubles as a strong ETag. The directory is shared by
+    every worker, so it is the only record of what is cached: a hit refreshes the file's
+    mtime and eviction removes the oldest files until the whole directory fits the limit.
+    """
+    
+    def __init__(self, directory: Path, max_bytes: int, temporary_grace: timedelta = EXPORT_CACHE_TEMPORARY_GRACE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.temporary_grace = temporary_grace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Renders still being written by other workers are younger than the grace period
+        abandoned_before = time.time() - self.temporary_grace.total_seconds()
+        for path in self.directory.glob("*.tmp"):
+            try:
+                if path.stat().st_mtime < abandoned_before:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+        self._evict()
+    
+    @staticmethod
+    def artifact_name(post_id: str, export_format: str, data_version: tuple) -> str:
+        digest = hashlib.sha256(repr((export_format, data_version)).encode('utf-8')).hexdigest()[:32]
+        return f"{post_id}.{digest}.{export_format}"
+    
+    @staticmethod
+    def etag(name: str) -> str:
+        return f'"{name.split(".")[1]}"'
+    
+    def get(self, name: str) -> Optional[Path]:
+        path = self.directory / name
+        try:
+            self._touch(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+    
+    def reserve(self) -> Path:
+        """Temporary path inside the cache directory so a finished artifact is admitted by a rename"""
+        handle, path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(handle)
+        return Path(path)
+    
+    def admit(self, name: str, temporary_path: Path) -> Path:
+        path = self.directory / name
+        os.replace(temporary_path, path)
+        self._touch(path)
+        self._evict(keep=name)
+        return path
+    
+    @staticmethod
+    def _touch(path: Path):
+        # The file system's own clock ticks too coarsely to order hits that close together
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+    
+    def _artifacts(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every finished artifact, least recently used first"""
+        artifacts = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another worker meanwhile
+            artifacts.append((stat.st_mtime, stat.st_size, path))
+        return sorted(artifacts)
+    
+    def _evict(self, keep: Optional[str] = None):
+        artifacts = self._artifacts()
+        total_bytes = sum(size for _, size, _ in artifacts)
+        for _, size, path in artifacts:
+            if total_bytes <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            self.evictions += 1
+    
+    def invalidate_post(self, post_id: str):
+        for path in self.directory.glob(f"{post_id}.*"):
+            if path.suffix != ".tmp":
+                path.unlink(missing_ok=True)
+                self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        artifacts = self._artifacts()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(artifacts),
+            "bytes": sum(size for _, size, _ in artifacts),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+export_cache = ExportArtifactCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
+
+class LatencyHistograms:
+    """Cumulative latency histograms per label set, rendered in the Prometheus text format.
+    
+    Stages are observed from parse pool threads as well as the event loop, hence the lock.
+    """
+    
+    def __init__(self, name: str, help_text: str, label_names: List[str], buckets: List[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series: Dict[tuple, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, labels: tuple, seconds: float):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series_items = sorted((labels, dict(series, buckets=list(series["buckets"]))) for labels, series in self.series.items())
+        
+        for labels, series in series_items:
+            label_text = ",".join(f'{name}="{prometheus_label_value(value)}"' for name, value in zip(self.label_names, labels))
+            separator = "," if label_text else ""
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f'{self.name}_bucket{{{label_text}{separator}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text}{separator}le="+Inf"}} {series["count"]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series['count']}")
+        return lines
+
+def prometheus_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+request_latency = LatencyHistograms(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response body is sent.",
+    ["method", "route", "status"],
+    METRICS_LATENCY_BUCKETS
+)
+stage_latency = LatencyHistograms(
+    "request_stage_duration_seconds",
+    "Time spent in a named stage (parsing, MongoDB calls, rendering) inside requests and upload jobs.",
+    ["stage"],
+    METRICS_LATENCY_BUCKETS
+)
+
+# Stage durations of the request being served, summed per stage for its Server-Timing header
+request_stage_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_stage_timings", default=None)
+
+@contextmanager
+def timed_stage(stage: str):
+    """Time a block into the stage histogram and the current request's Server-Timing entries"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_latency.observe((stage,), elapsed)
+        timings = request_stage_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+# Auth functions
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('ascii')
+
+def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    except ValueError:
+        # bcrypt refuses passwords over 72 bytes; no stored hash can match them
+        return False
+
+def jwt_signing_key() -> str:
+    if not JWT_SECRET:
+        raise RuntimeError("JWT signing key is not loaded; set JWT_SECRET or let the startup hook load it")
+    return JWT_SECRET
+
+async def load_jwt_secret():
+    """Use JWT_SECRET, or the key stored in MongoDB, generating and storing it on first start"""
+    global JWT_SECRET
+    if JWT_SECRET:
+        return
+    
+    stored = await db.settings.find_one({"_id": "jwt_secret"})
+    if stored is None:
+        try:
+            await db.settings.insert_one({"_id": "jwt_secret", "secret": secrets.token_urlsafe(48), "created_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            pass  # Another worker stored its key first; every worker uses that one
+        stored = await db.settings.find_one({"_id": "jwt_secret"})
+    JWT_SECRET = stored["secret"]
+
+def create_access_token(username: str, now: Optional[datetime] = None) -> str:
+    now = now or datetime.utcnow()
+    claims = {"sub": username, "iat": now, "exp": now + ACCESS_TOKEN_TTL}
+    return jwt.encode(claims, jwt_signing_key(), algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> str:
+    """Check a token's signature and expiry and return the admin username it was issued to"""
+    try:
+        claims = jwt.decode(token, jwt_signing_key(), algorithms=[JWT_ALGORITHM], options={"require": ["sub", "exp"]})
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Oturum süresi dolmuş ya da geçersiz",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims["sub"]
+
+async def verify_admin_credentials(credentials: Optional[HTTPBasicCredentials]) -> str:
+    """Check Basic credentials against the hashed admin accounts; bcrypt runs off the event loop"""
+    is_correct_password = False
+    if credentials is not None:
+        admin = await db.admins.find_one({"username": credentials.username}, {"_id": 0, "password_hash": 1})
+        password_hash = admin["password_hash"] if admin else UNKNOWN_ADMIN_PASSWORD_HASH
+        is_password_match = await asyncio.get_running_loop().run_in_executor(
+            None, verify_password, credentials.password, password_hash
+        )
+        is_correct_password = admin is not None and is_password_match
+    
+    if not is_correct_password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Yanlış kullanıcı adı ya da şifre",
@@ -99,10 +763,32 @@ def authenticate_admin(credentials: HTTPBasicCredentials = Depends(security)):
         )
     return credentials.username
 
+async def authenticate_admin(token: Optional[HTTPAuthorizationCredentials] = Depends(bearer_security)) -> str:
+    # Only /login pays for bcrypt; every other request is one signature check
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Oturum açmanız gerekiyor",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return decode_access_token(token.credentials)
+
+async def authenticate_metrics_scraper(token: Optional[HTTPAuthorizationCredentials] = Depends(bearer_security)):
+    # A scrape config can send a fixed token but cannot log in for an expiring one
+    if METRICS_TOKEN is None:
+        return
+    if token is None or not secrets.compare_digest(token.credentials.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Geçersiz metrik anahtarı",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
 # Helper functions
 def normalize_username(username: str) -> str:
     """Normalize username for accurate comparison - more aggressive approach"""
-    if not username or pd.isna(username):
+    # None, NaN and NaT cells; the missing values are the only ones unequal to themselves
+    if not username or username != username:
         return ""
     
     # Convert to string and strip whitespace
@@ -118,120 +804,1128 @@ def normalize_username(username: str) -> str:
     username = username.lower()
     
     # Remove all whitespace, dots, underscores, and hyphens for consistent matching
-    import re
-    username = re.sub(r'[\s\._\-]+', '', username)
+    username = USERNAME_SEPARATOR_PATTERN.sub('', username)
     
     # Remove any remaining special characters except alphanumeric
-    username = re.sub(r'[^a-z0-9]', '', username)
+    username = USERNAME_INVALID_PATTERN.sub('', username)
     
     return username
 
-def process_csv_excel_file(file_content: bytes, file_type: str) -> List[str]:
-    """Process CSV or Excel file and return list of usernames with improved error handling"""
-    try:
-        # Read file based on type
-        if file_type.startswith('text/csv') or 'csv' in file_type.lower():
-            # Try different encodings for CSV
-            for encoding in ['utf-8', 'utf-8-sig', 'latin1', 'cp1252']:
+def normalize_username_series(usernames: "pd.Series") -> "pd.Series":
+    """Vectorized normalize_username over a whole column - same output, element by element"""
+    usernames = usernames.astype(object)
+    
+    # Missing and falsy cells normalize to an empty string, like the scalar version
+    missing = usernames.isna()
+    empty = missing | ~usernames.where(~missing, True).astype(bool)
+    
+    normalized = (
+        usernames.where(~empty, '')
+        .astype(str)
+        .str.strip()
+        .str.replace('@', '', regex=False)
+        .str.lower()
+        .str.replace(USERNAME_SEPARATOR_PATTERN, '', regex=True)
+        .str.replace(USERNAME_INVALID_PATTERN, '', regex=True)
+    )
+    return normalized.where(~empty, '').astype(object)
+
+def is_csv_file_type(file_type: Optional[str]) -> bool:
+    file_type = file_type or ''
+    return file_type.startswith('text/csv') or 'csv' in file_type.lower()
+
+def find_username_column(columns: List[Any]) -> Any:
+    """Pick the username column by known names, falling back to the first column"""
+    for col in USERNAME_COLUMNS:
+        if col in columns:
+            logger.info(f"Found username column: {col}")
+            return col
+    
+    logger.info(f"Using first column as username: {columns[0]}")
+    return columns[0]
+
+def normalize_username_values(values: Iterable[Any]) -> List[str]:
+    """Normalize raw username cells, dropping the ones that normalize to an empty string"""
+    import pandas as pd
+    
+    with timed_stage("normalize"):
+        if not isinstance(values, pd.Series):
+            values = pd.Series(list(values), dtype=object)
+        
+        normalized = normalize_username_series(values)
+        # Only keep usernames where normalization didn't result in empty string
+        return normalized[normalized != ''].tolist()
+
+def detect_csv_encoding(fileobj: BinaryIO) -> str:
+    """Find the first encoding that decodes the whole file, reading it in chunks"""
+    for encoding in CSV_ENCODINGS:
+        fileobj.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            while True:
+                chunk = fileobj.read(UPLOAD_READ_CHUNK_SIZE)
+                if not chunk:
+                    decoder.decode(b'', final=True)
+                    return encoding
+                decoder.decode(chunk)
+        except UnicodeDecodeError:
+            continue
+    
+    raise Exception("CSV dosyası okunamadı - encoding sorunu")
+
+def iter_username_batches(fileobj: BinaryIO, file_type: Optional[str], batch_size: int = UPLOAD_BATCH_SIZE) -> Iterator[List[str]]:
+    """Parse a CSV or Excel file object incrementally and yield batches of normalized usernames"""
+    if is_csv_file_type(file_type):
+        import pandas as pd
+        
+        encoding = detect_csv_encoding(fileobj)
+        fileobj.seek(0)
+        
+        username_column = None
+        for chunk in pd.read_csv(fileobj, encoding=encoding, chunksize=batch_size):
+            if username_column is None:
+                logger.info(f"CSV opened with {encoding} encoding. Columns: {list(chunk.columns)}")
+                username_column = find_username_column(list(chunk.columns))
+            
+            yield normalize_username_values(chunk[username_column].dropna().astype(str))
+    else:  # Excel file
+        from openpyxl import load_workbook
+        
+        fileobj.seek(0)
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                raise Exception("Excel dosyasında başlık satırı bulunamadı")
+            
+            columns = list(header)
+            logger.info(f"Excel opened. Columns: {columns}")
+            column_index = columns.index(find_username_column(columns))
+            
+            raw_usernames = []
+            for row in rows:
+                value = row[column_index] if column_index < len(row) else None
+                if value is not None and not (isinstance(value, str) and value in EXCEL_NA_VALUES):
+                    raw_usernames.append(str(value))
+                if len(raw_usernames) >= batch_size:
+                    yield normalize_username_values(raw_usernames)
+                    raw_usernames = []
+            
+            if raw_usernames:
+                yield normalize_username_values(raw_usernames)
+        finally:
+            workbook.close()
+
+async def stream_upload_usernames(file: UploadFile, batch_size: int = UPLOAD_BATCH_SIZE) -> AsyncIterator[List[str]]:
+    """Yield normalized username batches from an upload without reading it into memory.
+    
+    Each batch is parsed on the parse pool, and at most PARSE_MAX_CONCURRENT_UPLOADS
+    uploads are parsed at the same time.
+    """
+    async with parse_pool.upload_slot():
+        batches = iter_username_batches(file.file, file.content_type, batch_size)
+        try:
+            while True:
                 try:
-                    df = pd.read_csv(io.StringIO(file_content.decode(encoding)))
-                    break
-                except UnicodeDecodeError:
+                    # Parse time includes the batch's normalization, which is also timed on its own
+                    with timed_stage("parse"):
+                        batch = await parse_pool.run(next, batches, None)
+                except Exception as e:
+                    logger.error(f"File processing error: {str(e)}")
+                    raise HTTPException(status_code=400, detail=f"Dosya işlenirken hata: {str(e)}")
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            try:
+                batches.close()
+            except ValueError:
+                pass  # Still running on a worker thread after the request was cancelled
+
+async def ingest_upload(
+    file: UploadFile,
+    collection,
+    scope: Dict[str, Any],
+    build_document: Callable[[str], Dict[str, Any]],
+    job: Optional[UploadJob] = None
+) -> Dict[str, Any]:
+    """Stream an upload into collection in batches, tagged with a fresh upload_version.
+    
+    Documents from earlier uploads are left alone; callers retire them once the new
+    version is complete. A failed upload removes its own partial batches.
+    """
+    upload_version = str(uuid.uuid4())
+    inserted_count = 0
+    sample_usernames = []
+    if job:
+        await job.advance(phase="parsing")
+    
+    try:
+        async with aclosing(stream_upload_usernames(file)) as batches:
+            async for usernames in batches:
+                if not usernames:
                     continue
-            else:
-                raise Exception("CSV dosyası okunamadı - encoding sorunu")
-        else:  # Excel file
-            df = pd.read_excel(io.BytesIO(file_content))
+                if job:
+                    await job.advance(rows_parsed=job.rows_parsed + len(usernames))
+                
+                documents = [dict(build_document(username), upload_version=upload_version) for username in usernames]
+                with timed_stage("mongo_insert"):
+                    await collection.insert_many(documents)
+                
+                inserted_count += len(documents)
+                if job:
+                    await job.advance(rows_inserted=inserted_count)
+                sample_usernames.extend(usernames[:5 - len(sample_usernames)])
+                logger.info(f"Inserted batch of {len(documents)} into {collection.name} ({inserted_count} so far)")
+        
+        if inserted_count == 0:
+            raise HTTPException(status_code=400, detail="Dosya işlenirken hata: Dosyada geçerli kullanıcı adı bulunamadı")
+    except BaseException:
+        # Cancellation included; rows left by a crash are collected by the orphan sweeps
+        await collection.delete_many({**scope, "upload_version": upload_version})
+        raise
+    
+    return {
+        "upload_version": upload_version,
+        "count": inserted_count,
+        "sample_users": sample_usernames
+    }
+
+background_tasks: Set[asyncio.Task] = set()
+
+def run_in_background(coro) -> asyncio.Task:
+    """Start a task that outlives the request, keeping a reference until it is done"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def spool_upload(file: UploadFile) -> UploadFile:
+    """Copy an upload into a file we own, since the request closes the original when it ends"""
+    spooled = UploadFile(
+        file=tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE),
+        filename=file.filename,
+        headers=file.headers
+    )
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        await spooled.write(chunk)
+    await spooled.seek(0)
+    return spooled
+
+async def run_job(job: UploadJob, work: Callable):
+    try:
+        result = await work(job)
+        await job.advance(phase="completed", result=result)
+    except HTTPException as e:
+        await job.advance(phase="failed", error=str(e.detail))
+    except Exception as e:
+        logger.exception(f"{job.kind} job {job.id} failed")
+        await job.advance(phase="failed", error=str(e))
+    
+    logger.info(f"{job.kind} job {job.id} finished: {job.phase}")
+
+async def start_upload_job(kind: str, file: UploadFile, process: Callable) -> JSONResponse:
+    """Spool the upload and process it in the background, answering with the job id at once"""
+    upload = await spool_upload(file)
+    
+    async def work(job: UploadJob) -> Dict[str, Any]:
+        try:
+            return await process(upload, job)
+        finally:
+            await upload.close()
+    
+    logger.info(f"Queuing {kind} upload job for file: {file.filename}")
+    return await start_job(kind, work)
+
+async def start_job(kind: str, work: Callable, message: str = "Dosya arka planda işleniyor") -> JSONResponse:
+    """Run work(job) in the background, answering with the job id at once"""
+    job = UploadJob(kind=kind)
+    await db.upload_jobs.insert_one(job.dict())
+    
+    run_in_background(run_job(job, work))
+    
+    logger.info(f"Queued {kind} job {job.id}")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+        "success": True,
+        "message": message,
+        "job_id": job.id,
+        "status_url": f"/api/uploads/jobs/{job.id}",
+        "events_url": f"/api/uploads/jobs/{job.id}/events"
+    })
+
+async def load_upload_job(job_id: str) -> Optional[UploadJob]:
+    document = await db.upload_jobs.find_one({"id": job_id}, {"_id": 0})
+    return UploadJob(**document) if document else None
+
+async def upload_job_events(job: UploadJob) -> AsyncIterator[str]:
+    """Server-sent events with the job state, sent whenever it changes until the job finishes.
+    
+    The job may run on another worker, so its stored state is polled.
+    """
+    last_payload = None
+    idle_seconds = 0.0
+    while True:
+        payload = job.json()
+        if payload != last_payload:
+            event = "done" if job.finished else "progress"
+            yield f"event: {event}\ndata: {payload}\n\n"
+            last_payload = payload
+            idle_seconds = 0.0
+        elif idle_seconds >= UPLOAD_JOB_KEEPALIVE_INTERVAL:
+            yield ": keep-alive\n\n"
+            idle_seconds = 0.0
+        
+        if job.finished:
+            return
+        
+        await asyncio.sleep(UPLOAD_JOB_POLL_INTERVAL)
+        idle_seconds += UPLOAD_JOB_POLL_INTERVAL
+        
+        job = await load_upload_job(job.id) or job.copy(update={"phase": "failed", "error": "Yükleme işi bulunamadı"})
+
+def active_engagements_filter(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Match the engagement rows of the post's active upload version.
+    
+    Posts that never went through a staged upload have no engagement_version;
+    all of their rows are active.
+    """
+    version = post.get("engagement_version")
+    if version is None:
+        return {"post_id": post["id"]}
+    return {"post_id": post["id"], "upload_version": version}
+
+def active_engagements_query(posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    filters = [active_engagements_filter(post) for post in posts]
+    return filters[0] if len(filters) == 1 else {"$or": filters}
+
+def is_packed(post: Dict[str, Any]) -> bool:
+    return post.get("engagement_storage") == "packed"
+
+async def load_post_engager_uids(posts: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Load the packed engager id arrays of the active versions of packed posts"""
+    uids: Dict[str, np.ndarray] = {post["id"]: np.empty(0, dtype='<u4') for post in posts}
+    if not posts:
+        return uids
+    
+    query = {"$or": [{"post_id": post["id"], "upload_version": post["engagement_version"]} for post in posts]}
+    async for packed in db.post_engagers.find(query, {"_id": 0, "post_id": 1, "uids": 1}):
+        uids[packed["post_id"]] = unpack_uids(packed["uids"])
+    
+    return uids
+
+async def load_post_engagers(posts: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """Load the engaged usernames of many posts with one query per storage layout"""
+    engagers: Dict[str, Set[str]] = {post["id"]: set() for post in posts}
+    packed_posts = [post for post in posts if is_packed(post)]
+    legacy_posts = [post for post in posts if not is_packed(post)]
+    
+    if packed_posts:
+        uids_per_post = await load_post_engager_uids(packed_posts)
+        all_uids = np.unique(np.concatenate(list(uids_per_post.values())))
+        username_by_uid = await username_dictionary.usernames(all_uids.tolist())
+        for post_id, uids in uids_per_post.items():
+            engagers[post_id] = {username_by_uid[uid] for uid in uids.tolist() if uid in username_by_uid}
+    
+    if legacy_posts:
+        cursor = db.engagements.find(
+            active_engagements_query(legacy_posts),
+            {"_id": 0, "post_id": 1, "username": 1}
+        )
+        async for engagement in cursor:
+            engagers[engagement["post_id"]].add(engagement["username"])
+    
+    return engagers
+
+async def count_post_engagements(posts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count engagements of many posts; packed posts carry their count, the rest share one $group"""
+    counts = {post["id"]: post.get("engagement_count", 0) if is_packed(post) else 0 for post in posts}
+    legacy_posts = [post for post in posts if not is_packed(post)]
+    if not legacy_posts:
+        return counts
+    
+    pipeline = [
+        {"$match": active_engagements_query(legacy_posts)},
+        {"$group": {"_id": "$post_id", "count": {"$sum": 1}}}
+    ]
+    async for row in db.engagements.aggregate(pipeline):
+        counts[row["_id"]] = row["count"]
+    
+    return counts
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset pagination values into an opaque url-safe cursor"""
+    payload = json.dumps(values, default=lambda value: value.isoformat(), separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, dict):
+            raise ValueError("cursor payload is not an object")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+
+def check_response_format(response_format: str):
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail="Yanıt biçimi json ya da ndjson olmalıdır")
+
+async def stream_ndjson(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Serialize rows with orjson, one document per line and a batch of lines per chunk"""
+    lines = []
+    async for row in rows:
+        lines.append(orjson.dumps(row))
+        if len(lines) >= NDJSON_BATCH_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+async def rows_with_next_cursor(rows: AsyncIterator[Dict[str, Any]], limit: int, cursor_fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Pass up to limit rows through, then a {"next_cursor": ...} line if another row follows.
+    
+    rows must yield one row past the limit for the cursor line to be sent.
+    """
+    last = None
+    count = 0
+    async for row in rows:
+        if count == limit:
+            yield {"next_cursor": encode_cursor({field: last[field] for field in cursor_fields})}
+            return
+        yield row
+        last = row
+        count += 1
+
+def ndjson_response(rows: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    return StreamingResponse(stream_ndjson(rows), media_type=NDJSON_MEDIA_TYPE)
+
+async def roster_usernames_cursor(platform: str):
+    """Usernames of a platform's active roster in username order, covered by the roster index"""
+    return db.users.find(
+        await active_roster_filter(platform),
+        {"_id": 0, "username": 1}
+    ).sort("username", ASCENDING).batch_size(ROSTER_BATCH_SIZE)
+
+async def load_roster_usernames(platform: str) -> List[str]:
+    """Stream a platform's active roster as bare usernames"""
+    return [user["username"] async for user in await roster_usernames_cursor(platform)]
+
+async def roster_engagement_rows(post: Dict[str, Any]) -> AsyncIterator[tuple]:
+    """Yield (username, engaged) for a post's roster in username order, straight from the roster cursor"""
+    engaged_set = (await load_post_engagers([post]))[post["id"]]
+    async for user in await roster_usernames_cursor(post["platform"]):
+        yield user["username"], user["username"] in engaged_set
+
+def build_engagement_analysis(post: Dict[str, Any], management_usernames: List[str], engaged_set: Set[str]) -> EngagementAnalysis:
+    """Split the roster into engaged and not engaged users with exact string matching"""
+    engaged_users = []
+    not_engaged_users = []
+    for username in management_usernames:
+        if username in engaged_set:
+            engaged_users.append(username)
+        else:
+            not_engaged_users.append(username)
+    
+    total_management = len(management_usernames)
+    engagement_percentage = (len(engaged_users) / total_management * 100) if total_management > 0 else 0
+    
+    return EngagementAnalysis(
+        post_id=post["id"],
+        post_title=post["title"],
+        platform=post["platform"],
+        total_management=total_management,
+        total_engaged=len(engaged_users),
+        engagement_percentage=round(engagement_percentage, 2),
+        engaged_users=engaged_users,
+        not_engaged_users=not_engaged_users
+    )
+
+async def compute_engagement_analysis(post: Dict[str, Any]) -> EngagementAnalysis:
+    # Get management users for this platform
+    with timed_stage("mongo_roster"):
+        management_usernames = await load_roster_usernames(post["platform"])
+    
+    # Get engagements for this post
+    with timed_stage("mongo_engagers"):
+        engaged_set = (await load_post_engagers([post]))[post["id"]]
+    
+    # Detailed debug logging
+    logger.info(f"=== ANALYSIS DEBUG ===")
+    logger.info(f"Post: {post['title']} ({post['platform']})")
+    logger.info(f"Management users count: {len(management_usernames)}")
+    logger.info(f"Management users sample: {management_usernames[:5]}")
+    logger.info(f"Engaged users count: {len(engaged_set)}")
+    
+    with timed_stage("match"):
+        analysis = build_engagement_analysis(post, management_usernames, engaged_set)
+    
+    logger.info(f"Final results - Engaged: {analysis.total_engaged}, Not Engaged: {len(analysis.not_engaged_users)}")
+    return analysis
+
+async def get_roster_version(platform: str) -> int:
+    counter = await db.counters.find_one({"_id": f"roster_version:{platform}"})
+    return counter.get("seq", 0) if counter else 0
+
+async def get_active_roster_version(platform: str) -> str:
+    """The upload_version of the users that make up a platform's roster"""
+    counter = await db.counters.find_one({"_id": f"roster_version:{platform}"}, {"upload_version": 1})
+    return counter.get("upload_version", LEGACY_ROSTER_VERSION) if counter else LEGACY_ROSTER_VERSION
+
+async def active_roster_filter(platform: str) -> Dict[str, Any]:
+    return {"platform": platform, "upload_version": await get_active_roster_version(platform)}
+
+async def active_rosters_query(platform: Optional[str] = None) -> Dict[str, Any]:
+    """Match the active roster of one platform, or of every platform"""
+    if platform:
+        return await active_roster_filter(platform)
+    return {"$or": [await active_roster_filter(platform) for platform in ["instagram", "x"]]}
+
+async def activate_roster_version(platform: str, upload_version: str) -> Optional[str]:
+    """Atomically make a fully staged roster the platform's roster; returns the version it replaced"""
+    previous = await db.counters.find_one_and_update(
+        {"_id": f"roster_version:{platform}"},
+        {"$set": {"upload_version": upload_version}, "$inc": {"seq": 1}},
+        projection={"upload_version": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    analysis_cache.invalidate_platform(platform)
+    return previous.get("upload_version", LEGACY_ROSTER_VERSION) if previous else LEGACY_ROSTER_VERSION
+
+async def collect_superseded_roster(platform: str, upload_version: str):
+    try:
+        delete_result = await db.users.delete_many({"platform": platform, "upload_version": upload_version})
+        logger.info(f"Collected {delete_result.deleted_count} users of the superseded {platform} roster")
+    except Exception as e:
+        logger.error(f"Collecting superseded roster failed: {str(e)}")
+
+async def collect_orphaned_rosters():
+    """Remove staged users of replace uploads that never became active, e.g. after a crash mid-upload"""
+    staged_before = datetime.utcnow() - ROSTER_STAGING_GRACE
+    collected = 0
+    try:
+        for platform in ["instagram", "x"]:
+            delete_result = await db.users.delete_many({
+                "platform": platform,
+                "upload_version": {"$ne": await get_active_roster_version(platform)},
+                "created_at": {"$lt": staged_before}
+            })
+            collected += delete_result.deleted_count
+        logger.info(f"Collected {collected} orphaned staged users")
+    except Exception as e:
+        logger.error(f"Collecting orphaned users failed: {str(e)}")
+
+async def adopt_unversioned_rosters():
+    """Stamp users stored before rosters were versioned with the legacy version, once per platform"""
+    for platform in ["instagram", "x"]:
+        counter_id = f"roster_version:{platform}"
+        try:
+            if await db.counters.find_one({"_id": counter_id, "upload_version": {"$exists": True}}):
+                continue
+            result = await db.users.update_many({"platform": platform}, {"$set": {"upload_version": LEGACY_ROSTER_VERSION}})
+            try:
+                await db.counters.update_one(
+                    {"_id": counter_id, "upload_version": {"$exists": False}},
+                    {"$set": {"upload_version": LEGACY_ROSTER_VERSION}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # Another worker recorded a version first
+            logger.info(f"Adopted {result.modified_count} unversioned users into the {platform} roster")
+        except Exception as e:
+            logger.error(f"Adopting unversioned users failed for {platform}: {str(e)}")
+
+async def bump_roster_version(platform: str):
+    """Record that a platform's roster changed, retiring the analyses computed from it"""
+    await db.counters.update_one({"_id": f"roster_version:{platform}"}, {"$inc": {"seq": 1}}, upsert=True)
+    analysis_cache.invalidate_platform(platform)
+
+def analysis_cache_key(post: Dict[str, Any], roster_version: int) -> tuple:
+    return (post["id"], post["platform"], post.get("engagement_version"), roster_version)
+
+async def cached_engagement_analysis(post: Dict[str, Any]) -> EngagementAnalysis:
+    key = analysis_cache_key(post, await get_roster_version(post["platform"]))
+    analysis = analysis_cache.get(key)
+    if analysis is None:
+        analysis = await compute_engagement_analysis(post)
+        analysis_cache.put(key, analysis)
+    return analysis
+
+def rollup_day(moment: datetime) -> datetime:
+    """Truncate a post date to the UTC day its rollups are kept under"""
+    return datetime(moment.year, moment.month, moment.day)
+
+@asynccontextmanager
+async def rollup_diff_in_flight():
+    """Mark a change to a post's engagers and its rollup diff as in flight.
+    
+    The marker is stored before the generation moves, so a rebuild that read the generation
+    either waits for the marker to go or sees the generation change and starts over.
+    """
+    marker = await db.rollup_diffs.insert_one({"started_at": datetime.utcnow()})
+    await db.counters.update_one({"_id": "rollup_generation"}, {"$inc": {"seq": 1}}, upsert=True)
+    try:
+        yield
+    finally:
+        await db.rollup_diffs.delete_one({"_id": marker.inserted_id})
+
+async def apply_rollup_diff(platform: str, day: datetime, added: Iterable[str], removed: Iterable[str]):
+    """Increment the daily counters of new engagers and decrement the removed ones.
+    
+    Decrements upsert as well: two flips of one post may land out of order, and a counter
+    that goes to -1 before its increment arrives must still end at 0. Only rows at exactly 0
+    are removed, since deleting one is the same as leaving it.
+    """
+    operations = [
+        UpdateOne({"platform": platform, "day": day, "username": username}, {"$inc": {"engaged_posts": 1}}, upsert=True)
+        for username in added
+    ] + [
+        UpdateOne({"platform": platform, "day": day, "username": username}, {"$inc": {"engaged_posts": -1}}, upsert=True)
+        for username in removed
+    ]
+    if not operations:
+        return
+    
+    await db.engagement_rollups.bulk_write(operations, ordered=False)
+    await db.engagement_rollups.delete_many({"platform": platform, "day": day, "engaged_posts": 0})
+
+async def acquire_rollup_rebuild_lock() -> Optional[str]:
+    """Take the rebuild lock unless another rebuild holds it; an expired lock is taken over"""
+    owner = str(uuid.uuid4())
+    now = datetime.utcnow()
+    try:
+        await db.counters.update_one(
+            {"_id": "rollups_rebuild_lock", "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + ROLLUP_REBUILD_LOCK_TTL}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    return owner
+
+async def rollup_generation() -> int:
+    counter = await db.counters.find_one({"_id": "rollup_generation"})
+    return counter.get("seq", 0) if counter else 0
+
+async def wait_for_rollup_diffs() -> bool:
+    """Wait for the rollup diffs in flight to finish; False if they are still running after the wait"""
+    deadline = time.monotonic() + ROLLUP_DIFF_WAIT_SECONDS
+    while True:
+        in_flight = await db.rollup_diffs.count_documents(
+            {"started_at": {"$gt": datetime.utcnow() - ROLLUP_REBUILD_LOCK_TTL}}, limit=1
+        )
+        if not in_flight:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.5)
+
+async def release_rollup_rebuild_lock(owner: str):
+    await db.counters.delete_one({"_id": "rollups_rebuild_lock", "owner": owner})
+
+async def rebuild_rollups() -> Optional[int]:
+    """Recompute every rollup from the stored engagements without emptying the live collection.
+    
+    Returns None when another rebuild holds the lock.
+    """
+    owner = await acquire_rollup_rebuild_lock()
+    if owner is None:
+        logger.info("Rollup rebuild skipped, another rebuild is running")
+        return None
+    
+    try:
+        for attempt in range(1, ROLLUP_REBUILD_ATTEMPTS + 1):
+            # Diffs that started before the generation was read finish before the posts are read;
+            # any later one moves the generation
+            generation = await rollup_generation()
+            if await wait_for_rollup_diffs():
+                rollup_count = await build_rollups_collection()
+                
+                # A diff that started before the rename may have been written to the replaced
+                # collection, so the generation is checked again once the swap is done
+                if await rollup_generation() == generation:
+                    await db[ROLLUP_REBUILD_COLLECTION].rename("engagement_rollups", dropTarget=True)
+                    if await rollup_generation() == generation:
+                        break
+            logger.info(f"Rollups changed during rebuild attempt {attempt}, starting over")
+        else:
+            await db[ROLLUP_REBUILD_COLLECTION].drop()
+            raise Exception("Özetler yeniden oluşturulurken sürekli değişti")
+    finally:
+        await release_rollup_rebuild_lock(owner)
+    
+    await db.counters.update_one({"_id": "rollups_built"}, {"$set": {"at": datetime.utcnow()}}, upsert=True)
+    logger.info(f"Rebuilt {rollup_count} engagement rollups")
+    return rollup_count
+
+async def build_rollups_collection() -> int:
+    """Fill the side collection with rollups computed from every post's active engagers"""
+    rebuild = db[ROLLUP_REBUILD_COLLECTION]
+    await rebuild.drop()
+    await rebuild.create_indexes(INDEX_SPECS["engagement_rollups"])
+    
+    rollups = Counter()
+    async for post in db.posts.find({}, {"_id": 0, "id": 1, "platform": 1, "post_date": 1, "engagement_version": 1, "engagement_storage": 1}):
+        day = rollup_day(post["post_date"])
+        for username in (await load_post_engagers([post]))[post["id"]]:
+            rollups[(post["platform"], day, username)] += 1
+    
+    documents = [
+        {"platform": platform, "day": day, "username": username, "engaged_posts": engaged_posts}
+        for (platform, day, username), engaged_posts in rollups.items()
+    ]
+    for start in range(0, len(documents), UPLOAD_BATCH_SIZE):
+        await rebuild.insert_many(documents[start:start + UPLOAD_BATCH_SIZE])
+    return len(documents)
+
+async def ensure_rollups():
+    """Backfill rollups once for data stored before they were maintained"""
+    try:
+        if await db.counters.find_one({"_id": "rollups_built"}) is None:
+            await rebuild_rollups()
+    except Exception as e:
+        logger.error(f"Rollup backfill failed: {str(e)}")
+
+async def sum_rollups(start: datetime, end: datetime, platform: Optional[str] = None) -> Counter:
+    """Sum engaged posts per (platform, username) over the days in [start, end)"""
+    match = {"day": {"$gte": start, "$lt": end}}
+    if platform:
+        match["platform"] = platform
+    
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"platform": "$platform", "username": "$username"},
+            "engaged_posts": {"$sum": "$engaged_posts"}
+        }}
+    ]
+    engaged_counts = Counter()
+    async for row in db.engagement_rollups.aggregate(pipeline, allowDiskUse=True):
+        engaged_counts[(row["_id"]["platform"], row["_id"]["username"])] = row["engaged_posts"]
+    return engaged_counts
+
+async def count_posts_per_platform(start: datetime, end: datetime) -> Counter:
+    pipeline = [
+        {"$match": {"post_date": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": "$platform", "count": {"$sum": 1}}}
+    ]
+    return Counter({row["_id"]: row["count"] async for row in db.posts.aggregate(pipeline)})
+
+async def batch_engagement_analyses(posts: List[Dict[str, Any]]) -> Dict[str, EngagementAnalysis]:
+    """Analyze many posts, loading each platform roster once and all engagers in one pass"""
+    platforms = {post["platform"] for post in posts}
+    roster_versions = {platform: await get_roster_version(platform) for platform in platforms}
+    
+    analyses = {}
+    missing_posts = []
+    for post in posts:
+        analysis = analysis_cache.get(analysis_cache_key(post, roster_versions[post["platform"]]))
+        if analysis is None:
+            missing_posts.append(post)
+        else:
+            analyses[post["id"]] = analysis
+    
+    if missing_posts:
+        rosters = {platform: await load_roster_usernames(platform) for platform in {post["platform"] for post in missing_posts}}
+        engagers = await load_post_engagers(missing_posts)
+        for post in missing_posts:
+            analysis = build_engagement_analysis(post, rosters[post["platform"]], engagers[post["id"]])
+            analysis_cache.put(analysis_cache_key(post, roster_versions[post["platform"]]), analysis)
+            analyses[post["id"]] = analysis
+    
+    logger.info(f"Batch analysis of {len(posts)} posts, {len(missing_posts)} computed")
+    return analyses
+
+def build_engagement_report(users: List[Dict[str, Any]], posts_per_platform: Counter, engaged_counts: Counter) -> List[Dict[str, Any]]:
+    """Compute per-user engaged post counts and rates from per-platform totals"""
+    return [engagement_report_row(user, posts_per_platform, engaged_counts) for user in users]
+
+def engagement_report_row(user: Dict[str, Any], posts_per_platform: Counter, engaged_counts: Counter) -> Dict[str, Any]:
+    total_posts_for_platform = posts_per_platform[user["platform"]]
+    user_engagement_count = engaged_counts[(user["platform"], user["username"])]
+    engagement_rate = (user_engagement_count / total_posts_for_platform * 100) if total_posts_for_platform > 0 else 0
+    
+    return {
+        "username": user["username"],
+        "platform": user["platform"],
+        "engaged_posts": user_engagement_count,
+        "total_posts": total_posts_for_platform,
+        "engagement_rate": round(engagement_rate, 2)
+    }
+
+def weekly_report_window() -> tuple:
+    """Posts of the last 7 days by post date, today included"""
+    week_start = rollup_day(datetime.utcnow()) - timedelta(days=6)
+    return week_start, week_start + timedelta(days=7)
+
+REPORT_BUCKETS = ["day", "week", "month"]
+
+def bucket_start(day: datetime, bucket: str) -> datetime:
+    """First day of the day/week/month bucket a day falls into; weeks start on Monday"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def next_bucket_start(start: datetime, bucket: str) -> datetime:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+def bucket_starts(start: datetime, end: datetime, bucket: str) -> List[datetime]:
+    """Starts of all buckets overlapping the days in [start, end)"""
+    starts = []
+    current = bucket_start(start, bucket)
+    while current < end:
+        starts.append(current)
+        current = next_bucket_start(current, bucket)
+    return starts
+
+def bucket_start_expression(field: str, bucket: str) -> Dict[str, Any]:
+    """$dateTrunc of a date field to the start of its bucket, matching bucket_start"""
+    return {"$dateTrunc": {"date": f"${field}", "unit": bucket, "startOfWeek": "monday"}}
+
+def build_range_report(
+    management_usernames: List[str],
+    platform: str,
+    buckets: List[datetime],
+    post_counts: Iterable[Dict[str, Any]],
+    rollups: Iterable[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Per-user engaged post series over the buckets, from post counts and rollups already grouped by bucket"""
+    bucket_index = {start: index for index, start in enumerate(buckets)}
+    
+    posts_per_bucket = [0] * len(buckets)
+    for post_count in post_counts:
+        posts_per_bucket[bucket_index[post_count["_id"]]] += post_count["posts"]
+    total_posts = sum(posts_per_bucket)
+    
+    roster = set(management_usernames)
+    series = {}
+    for rollup in rollups:
+        username = rollup["_id"]["username"]
+        if username not in roster:
+            continue
+        user_series = series.setdefault(username, [0] * len(buckets))
+        user_series[bucket_index[rollup["_id"]["bucket"]]] += rollup["engaged_posts"]
+    
+    users = []
+    for username in management_usernames:
+        user_series = series.get(username, [0] * len(buckets))
+        engaged_posts = sum(user_series)
+        engagement_rate = (engaged_posts / total_posts * 100) if total_posts > 0 else 0
+        users.append({
+            "username": username,
+            "platform": platform,
+            "series": user_series,
+            "engaged_posts": engaged_posts,
+            "total_posts": total_posts,
+            "engagement_rate": round(engagement_rate, 2)
+        })
+    
+    return {
+        "buckets": [start.date().isoformat() for start in buckets],
+        "posts_per_bucket": posts_per_bucket,
+        "users": users,
+        "summary": {
+            "total_users": len(users),
+            "total_posts": total_posts,
+            "active_users": len([u for u in users if u["engaged_posts"] > 0])
+        }
+    }
+
+MATRIX_DEFAULT_POSTS = 10
+
+async def select_matrix_posts(
+    platform: str,
+    post_ids: Optional[List[str]],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    last: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Pick the posts of a matrix by ids, by post date range or as the latest ones, oldest first"""
+    projection = {"_id": 0, "id": 1, "title": 1, "platform": 1, "post_date": 1, "engagement_version": 1, "engagement_storage": 1}
+    query: Dict[str, Any] = {"platform": platform}
+    
+    if post_ids:
+        query["id"] = {"$in": post_ids}
+        posts = await db.posts.find(query, projection).to_list(None)
+    elif start or end:
+        query["post_date"] = {}
+        if start:
+            query["post_date"]["$gte"] = rollup_day(start)
+        if end:
+            query["post_date"]["$lt"] = rollup_day(end) + timedelta(days=1)
+        posts = await db.posts.find(query, projection).to_list(None)
+    else:
+        posts = await db.posts.find(query, projection).sort("post_date", DESCENDING).limit(last or MATRIX_DEFAULT_POSTS).to_list(None)
+    
+    return sorted(posts, key=lambda post: (post["post_date"], post["id"]))
+
+async def load_engagement_matrix(posts: List[Dict[str, Any]], management_usernames: List[str]) -> np.ndarray:
+    """Boolean users x posts matrix of who engaged with what"""
+    matrix = np.zeros((len(management_usernames), len(posts)), dtype=bool)
+    if not posts or not management_usernames:
+        return matrix
+    
+    packed_posts = [post for post in posts if is_packed(post)]
+    legacy_posts = [post for post in posts if not is_packed(post)]
+    column = {post["id"]: index for index, post in enumerate(posts)}
+    
+    # Packed posts are matched in id space against the roster's ids
+    if packed_posts:
+        roster_uids = await username_dictionary.lookup(management_usernames)
+        for post_id, uids in (await load_post_engager_uids(packed_posts)).items():
+            matrix[:, column[post_id]] = np.isin(roster_uids, uids.astype(np.int64))
+    
+    if legacy_posts:
+        roster = np.array(management_usernames, dtype=object)
+        for post_id, engagers in (await load_post_engagers(legacy_posts)).items():
+            matrix[:, column[post_id]] = np.isin(roster, np.array(list(engagers), dtype=object))
+    
+    return matrix
+
+async def compute_engagement_matrix(
+    platform: str,
+    post_ids: Optional[List[str]],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    last: Optional[int]
+) -> tuple:
+    if platform not in ["instagram", "x"]:
+        raise HTTPException(status_code=400, detail="Platform instagram ya da x olmalıdır")
+    
+    posts = await select_matrix_posts(platform, post_ids, start, end, last)
+    management_usernames = await load_roster_usernames(platform)
+    matrix = await load_engagement_matrix(posts, management_usernames)
+    return posts, management_usernames, matrix
+
+def summarize_engagement_matrix(
+    matrix: np.ndarray,
+    management_usernames: List[str],
+    posts: List[Dict[str, Any]],
+    top_k: int,
+    min_missed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Per-user and per-post totals, missed-post streaks and the least engaged users of a matrix"""
+    user_count, post_count = matrix.shape
+    missed = ~matrix
+    
+    engaged_per_user = matrix.sum(axis=1)
+    missed_per_user = post_count - engaged_per_user
+    engaged_per_post = matrix.sum(axis=0)
+    
+    if post_count:
+        # Longest run of missed posts: count misses, restarting the count at every engaged post
+        missed_so_far = np.cumsum(missed, axis=1, dtype=np.int32)
+        at_last_engagement = np.maximum.accumulate(np.where(matrix, missed_so_far, 0), axis=1)
+        longest_missed_streak = (missed_so_far - at_last_engagement).max(axis=1)
+        
+        # Current run of missed posts: distance from the newest post back to the last engagement
+        newest_first = matrix[:, ::-1]
+        current_missed_streak = np.where(newest_first.any(axis=1), newest_first.argmax(axis=1), post_count)
+    else:
+        longest_missed_streak = np.zeros(user_count, dtype=np.int32)
+        current_missed_streak = np.zeros(user_count, dtype=np.int32)
+    
+    usernames = np.array(management_usernames, dtype=str)
+    # Fewest engagements first, then the longest current miss streak, then by username
+    least_engaged_order = np.lexsort((usernames, -current_missed_streak, engaged_per_user))[:top_k]
+    
+    users = [
+        {
+            "username": username,
+            "engaged_posts": engaged,
+            "missed_posts": missed_count,
+            "engagement_rate": round(engaged / post_count * 100, 2) if post_count else 0,
+            "longest_missed_streak": longest,
+            "current_missed_streak": current
+        }
+        for username, engaged, missed_count, longest, current in zip(
+            management_usernames,
+            engaged_per_user.tolist(),
+            missed_per_user.tolist(),
+            longest_missed_streak.tolist(),
+            current_missed_streak.tolist()
+        )
+    ]
+    
+    summary = {
+        "total_users": user_count,
+        "total_posts": post_count,
+        "posts": [
+            {
+                "id": post["id"],
+                "title": post["title"],
+                "post_date": post["post_date"],
+                "engaged": engaged,
+                "engagement_rate": round(engaged / user_count * 100, 2) if user_count else 0
+            }
+            for post, engaged in zip(posts, engaged_per_post.tolist())
+        ],
+        "users": users,
+        "least_engaged": [users[index] for index in least_engaged_order.tolist()]
+    }
+    
+    if min_missed is not None:
+        flagged = np.flatnonzero(missed_per_user >= min_missed)
+        summary["missed_at_least"] = {
+            "min_missed": min_missed,
+            "count": len(flagged),
+            "users": [management_usernames[index] for index in flagged.tolist()]
+        }
+    
+    return summary
+
+# Routes
+@api_router.get("/")
+async def root():
+    return {"message": "Sosyal Medya Etkileşim Takip Sistemi API"}
+
+@api_router.post("/login")
+async def login(credentials: Optional[HTTPBasicCredentials] = Depends(security)):
+    username = await verify_admin_credentials(credentials)
+    return {
+        "message": "Giriş başarılı",
+        "username": username,
+        "access_token": create_access_token(username),
+        "token_type": "bearer",
+        "expires_in": int(ACCESS_TOKEN_TTL.total_seconds())
+    }
+
+# User Management Routes
+async def process_user_upload(platform: str, file: UploadFile, job: Optional[UploadJob] = None) -> Dict[str, Any]:
+    logger.info(f"Starting user upload for platform: {platform}, file: {file.filename}")
+    
+    # Users are staged batch by batch under a new version while the file is parsed;
+    # readers keep seeing the active roster until the new one is complete
+    result = await ingest_upload(
+        file,
+        db.users,
+        {"platform": platform},
+        lambda username: User(username=username, platform=platform).dict(),
+        job
+    )
+    
+    # Flip the platform to the new roster, then collect only the version it replaced so
+    # concurrent uploads still being staged for the platform are left alone
+    if job:
+        await job.advance(phase="replacing")
+    previous_version = await activate_roster_version(platform, result["upload_version"])
+    run_in_background(collect_superseded_roster(platform, previous_version))
+    
+    logger.info(f"Uploaded {result['count']} users for platform {platform}")
+    
+    return {
+        "success": True,
+        "message": f"{result['count']} kullanıcı başarıyla yüklendi ({platform})",
+        "count": result["count"],
+        "platform": platform,
+        "sample_users": result["sample_users"]  # Show first 5 as sample
+    }
+
+def diff_roster(uploaded_usernames: Dict[str, None], stored_usernames: Set[str]) -> Tuple[List[str], List[str]]:
+    """Usernames to add, in upload order, and usernames to remove, sorted"""
+    added = [username for username in uploaded_usernames if username not in stored_usernames]
+    removed = sorted(stored_usernames.difference(uploaded_usernames))
+    return added, removed
+
+def roster_diff_summary(uploaded_usernames: Dict[str, None], added: List[str], removed: List[str]) -> Dict[str, Any]:
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "unchanged": len(uploaded_usernames) - len(added),
+        "added_sample": added[:20],
+        "removed_sample": removed[:20]
+    }
+
+async def sync_user_upload(platform: str, file: UploadFile, job: Optional[UploadJob] = None) -> Dict[str, Any]:
+    """Apply only the difference between the uploaded roster and the stored one"""
+    logger.info(f"Starting user sync for platform: {platform}, file: {file.filename}")
+    if job:
+        await job.advance(phase="parsing")
+    
+    # dict keeps the file order for the added users while dropping duplicates
+    uploaded_usernames: Dict[str, None] = {}
+    async with aclosing(stream_upload_usernames(file)) as batches:
+        async for usernames in batches:
+            uploaded_usernames.update(dict.fromkeys(usernames))
+            if job:
+                await job.advance(rows_parsed=job.rows_parsed + len(usernames))
+    
+    if not uploaded_usernames:
+        raise HTTPException(status_code=400, detail="Dosya işlenirken hata: Dosyada geçerli kullanıcı adı bulunamadı")
+    
+    if job:
+        await job.advance(phase="replacing")
+    for attempt in range(1, ROSTER_SYNC_ATTEMPTS + 1):
+        roster_filter = await active_roster_filter(platform)
+        stored_usernames = set()
+        with timed_stage("mongo_read"):
+            async for user in db.users.find(roster_filter, {"_id": 0, "username": 1}):
+                stored_usernames.add(user["username"])
         
-        logger.info(f"File read successfully. Shape: {df.shape}, Columns: {list(df.columns)}")
+        added, removed = diff_roster(uploaded_usernames, stored_usernames)
+        operations = [
+            InsertOne(dict(User(username=username, platform=platform).dict(), upload_version=roster_filter["upload_version"]))
+            for username in added
+        ]
+        if removed:
+            operations.append(DeleteMany({**roster_filter, "username": {"$in": removed}}))
         
-        # Try to find username column - check multiple possible column names
-        username_column = None
-        possible_columns = ['username', 'kullanici_adi', 'kullanıcı_adı', 'user', 'name', 'isim']
+        if not operations:
+            break
         
-        # First try exact column name matches
-        for col in possible_columns:
-            if col in df.columns:
-                username_column = col
+        # A replace upload that becomes active meanwhile would take these writes down with
+        # the version it supersedes, so the diff only counts if the version held throughout
+        if await active_roster_filter(platform) == roster_filter:
+            with timed_stage("mongo_write"):
+                await db.users.bulk_write(operations, ordered=False)
+            if await active_roster_filter(platform) == roster_filter:
+                await bump_roster_version(platform)
                 break
-        
-        # If no match found, use first column
-        if username_column is None:
-            username_column = df.columns[0]
-            logger.info(f"Using first column as username: {username_column}")
-        else:
-            logger.info(f"Found username column: {username_column}")
-        
-        # Extract usernames from the identified column
-        raw_usernames = df[username_column].dropna().astype(str).tolist()
-        logger.info(f"Raw usernames count: {len(raw_usernames)}, Sample: {raw_usernames[:3]}")
-        
-        # Normalize all usernames
-        normalized_usernames = []
-        for username in raw_usernames:
-            normalized = normalize_username(username)
-            if normalized:  # Only add if normalization didn't result in empty string
-                normalized_usernames.append(normalized)
-                
-        logger.info(f"Normalized usernames count: {len(normalized_usernames)}, Sample: {normalized_usernames[:3]}")
-        
-        if not normalized_usernames:
-            raise Exception("Dosyada geçerli kullanıcı adı bulunamadı")
-            
-        return normalized_usernames
-        
-    except Exception as e:
-        logger.error(f"File processing error: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Dosya işlenirken hata: {str(e)}")
-
-# Routes
-@api_router.get("/")
-async def root():
-    return {"message": "Sosyal Medya Etkileşim Takip Sistemi API"}
-
-@api_router.post("/login")
-async def login(credentials: HTTPBasicCredentials = Depends(security)):
-    username = authenticate_admin(credentials)
-    return {"message": "Giriş başarılı", "username": username}
+        logger.info(f"Roster of {platform} replaced during sync attempt {attempt}, starting over")
+    else:
+        raise HTTPException(status_code=409, detail="Kullanıcı listesi eşzamanlı olarak değiştirildi, lütfen tekrar deneyin")
+    if job:
+        await job.advance(rows_inserted=len(added))
+    
+    logger.info(f"Synced users for platform {platform}: {len(added)} added, {len(removed)} removed")
+    
+    return {
+        "success": True,
+        "message": f"{len(uploaded_usernames)} kullanıcı senkronize edildi ({platform}): {len(added)} eklendi, {len(removed)} silindi",
+        "count": len(uploaded_usernames),
+        "platform": platform,
+        "sample_users": list(uploaded_usernames)[:5],
+        "diff": roster_diff_summary(uploaded_usernames, added, removed)
+    }
 
-# User Management Routes
 @api_router.post("/users/upload", response_model=Dict[str, Any])
 async def upload_users(
     platform: str = Form(...),
     file: UploadFile = File(...),
+    mode: str = Form("replace"),
+    async_job: bool = Form(False),
     _: str = Depends(authenticate_admin)
 ):
     if platform not in ["instagram", "x"]:
         raise HTTPException(status_code=400, detail="Platform instagram ya da x olmalıdır")
+    if mode not in ["replace", "sync"]:
+        raise HTTPException(status_code=400, detail="Yükleme modu replace ya da sync olmalıdır")
     
-    logger.info(f"Starting user upload for platform: {platform}, file: {file.filename}")
-    
-    content = await file.read()
-    usernames = process_csv_excel_file(content, file.content_type)
-    
-    logger.info(f"Processed {len(usernames)} usernames for platform {platform}")
-    
-    # Insert users into database
-    users_to_insert = []
-    for username in usernames:
-        user = User(username=username, platform=platform)
-        users_to_insert.append(user.dict())
+    # replace swaps in the whole roster, sync only writes the added and removed users
+    process = sync_user_upload if mode == "sync" else process_user_upload
     
-    if users_to_insert:
-        # Remove existing users for this platform first
-        delete_result = await db.users.delete_many({"platform": platform})
-        logger.info(f"Deleted {delete_result.deleted_count} existing users for platform {platform}")
-        
-        insert_result = await db.users.insert_many(users_to_insert)
-        logger.info(f"Inserted {len(insert_result.inserted_ids)} new users")
+    if async_job:
+        return await start_upload_job("users", file, lambda upload, job: process(platform, upload, job))
     
-    return {
-        "success": True,
-        "message": f"{len(usernames)} kullanıcı başarıyla yüklendi ({platform})",
-        "count": len(usernames),
-        "platform": platform,
-        "sample_users": usernames[:5]  # Show first 5 as sample
-    }
+    return await process(platform, file)
 
 @api_router.post("/users/add", response_model=User)
 async def add_user_manually(
@@ -246,23 +1940,69 @@ async def add_user_manually(
         raise HTTPException(status_code=400, detail="Geçerli bir kullanıcı adı girilmelidir")
     
     user = User(username=normalized_username, platform=user_data.platform)
-    await db.users.insert_one(user.dict())
+    await db.users.insert_one(dict(user.dict(), upload_version=await get_active_roster_version(user.platform)))
+    await bump_roster_version(user.platform)
     return user
 
-@api_router.get("/users", response_model=List[User])
-async def get_users(platform: Optional[str] = None, _: str = Depends(authenticate_admin)):
-    query = {}
-    if platform:
-        query["platform"] = platform
+def username_prefix_filter(search: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Anchored, case-sensitive regex over stored usernames so MongoDB bounds it to an index range"""
+    prefix = normalize_username(search) if search else ""
+    if not prefix:
+        return None
+    return {"$regex": f"^{re.escape(prefix)}"}
+
+@api_router.get("/users", response_model=List[User], response_class=ORJSONResponse)
+async def get_users(
+    platform: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = "json",
+    _: str = Depends(authenticate_admin)
+):
+    # Keyset pagination over (username, id); without a limit every matching user is returned
+    check_response_format(format)
+    query = {"$and": [await active_rosters_query(platform)]}
+    
+    username_filter = username_prefix_filter(search)
+    if username_filter:
+        query["username"] = username_filter
+    
+    if cursor:
+        after = decode_cursor(cursor)
+        if not isinstance(after.get("username"), str) or not isinstance(after.get("id"), str):
+            raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+        query["$and"].append({"$or": [
+            {"username": {"$gt": after["username"]}},
+            {"username": after["username"], "id": {"$gt": after["id"]}}
+        ]})
     
-    users = await db.users.find(query).to_list(1000)
-    return [User(**user) for user in users]
+    users_cursor = db.users.find(query, USER_PROJECTION).sort([("username", ASCENDING), ("id", ASCENDING)])
+    if format == "ndjson":
+        # Rows go out as the cursor yields them; a limited page ends with a line carrying the next cursor
+        if limit is None:
+            return ndjson_response(users_cursor.batch_size(ROSTER_BATCH_SIZE))
+        users_cursor = users_cursor.limit(limit + 1).batch_size(ROSTER_BATCH_SIZE)
+        return ndjson_response(rows_with_next_cursor(users_cursor, limit, ["username", "id"]))
+    
+    if limit is not None:
+        users_cursor = users_cursor.limit(limit + 1)
+    users = await users_cursor.to_list(None)
+    
+    headers = {}
+    if limit is not None and len(users) > limit:
+        users = users[:limit]
+        last = users[-1]
+        headers["X-Next-Cursor"] = encode_cursor({"username": last["username"], "id": last["id"]})
+    
+    return ORJSONResponse(users, headers=headers)
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, _: str = Depends(authenticate_admin)):
-    result = await db.users.delete_one({"id": user_id})
-    if result.deleted_count == 0:
+    deleted_user = await db.users.find_one_and_delete({"id": user_id}, projection={"_id": 0, "platform": 1})
+    if deleted_user is None:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    await bump_roster_version(deleted_user["platform"])
     return {"message": "Kullanıcı silindi"}
 
 # Post Management Routes
@@ -272,39 +2012,197 @@ async def create_post(post_data: PostCreate, _: str = Depends(authenticate_admin
     await db.posts.insert_one(post.dict())
     return post
 
-@api_router.get("/posts", response_model=List[Dict[str, Any]])
-async def get_posts(_: str = Depends(authenticate_admin)):
-    posts = await db.posts.find().sort("created_at", -1).to_list(100)
+def post_response_row(post: Dict[str, Any], engagement_count: int) -> Dict[str, Any]:
+    row = {field: post[field] for field in POST_FIELDS}
+    row["has_engagement_data"] = engagement_count > 0
+    row["engagement_count"] = engagement_count
+    return row
+
+@api_router.get("/posts", response_model=List[Dict[str, Any]], response_class=ORJSONResponse)
+async def get_posts(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    _: str = Depends(authenticate_admin)
+):
+    # Keyset pagination over (created_at, id); without a limit every post is returned
+    query = {}
+    if cursor:
+        after = decode_cursor(cursor)
+        try:
+            after_created_at = datetime.fromisoformat(after["created_at"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+        query["$or"] = [
+            {"created_at": {"$lt": after_created_at}},
+            {"created_at": after_created_at, "id": {"$lt": after.get("id")}}
+        ]
     
-    # Add engagement data status for each post
-    posts_with_status = []
-    for post in posts:
-        post_dict = Post(**post).dict()
-        
-        # Check if this post has engagement data
-        engagement_count = await db.engagements.count_documents({"post_id": post["id"]})
-        post_dict["has_engagement_data"] = engagement_count > 0
-        post_dict["engagement_count"] = engagement_count
-        
-        posts_with_status.append(post_dict)
+    # Model fields plus what count_post_engagements needs to pick the active engagement version
+    projection = {"_id": 0, "engagement_version": 1, "engagement_storage": 1, "engagement_count": 1}
+    projection.update({field: 1 for field in POST_FIELDS})
+    posts_cursor = db.posts.find(query, projection).sort([("created_at", -1), ("id", -1)])
+    if limit is not None:
+        posts_cursor = posts_cursor.limit(limit + 1)
+    posts = await posts_cursor.to_list(None)
+    
+    headers = {}
+    if limit is not None and len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1]
+        headers["X-Next-Cursor"] = encode_cursor({"created_at": last["created_at"], "id": last["id"]})
     
-    return posts_with_status
+    # Add engagement data status for each post with one aggregation for the whole page
+    engagement_counts = await count_post_engagements(posts)
+    
+    return ORJSONResponse([post_response_row(post, engagement_counts[post["id"]]) for post in posts], headers=headers)
 
 @api_router.delete("/posts/{post_id}")
 async def delete_post(post_id: str, _: str = Depends(authenticate_admin)):
-    # First delete all engagements for this post
-    await db.engagements.delete_many({"post_id": post_id})
-    
-    # Then delete the post
-    result = await db.posts.delete_one({"id": post_id})
+    async with rollup_diff_in_flight():
+        # Take the post's engagers out of the rollups while they can still be loaded
+        post = await db.posts.find_one({"id": post_id})
+        if post:
+            engagers = (await load_post_engagers([post]))[post_id]
+            await apply_rollup_diff(post["platform"], rollup_day(post["post_date"]), [], engagers)
+        
+        # First delete all engagements for this post
+        await db.engagements.delete_many({"post_id": post_id})
+        await db.post_engagers.delete_many({"post_id": post_id})
+        
+        # Then delete the post
+        result = await db.posts.delete_one({"id": post_id})
+    analysis_cache.invalidate_post(post_id)
+    export_cache.invalidate_post(post_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
     
     return {"message": "Gönderi ve ilgili etkileşim verileri başarıyla silindi"}
+async def stage_packed_engagers(post: Dict[str, Any], uids: np.ndarray) -> str:
+    """Store a post's engager ids as one packed document under a new upload version"""
+    upload_version = str(uuid.uuid4())
+    uids = np.unique(uids)
+    await db.post_engagers.insert_one({
+        "post_id": post["id"],
+        "platform": post["platform"],
+        "upload_version": upload_version,
+        "uids": pack_uids(uids),
+        "count": len(uids),
+        "created_at": datetime.utcnow()
+    })
+    return upload_version
+
+async def activate_engagement_version(post: Dict[str, Any], upload_version: str, uids: np.ndarray):
+    """Atomically point the post at a fully staged engagement version and retire the old one"""
+    post_id = post["id"]
+    async with rollup_diff_in_flight():
+        previous_post = await db.posts.find_one_and_update(
+            {"id": post_id},
+            {"$set": {
+                "engagement_version": upload_version,
+                "engagement_storage": "packed",
+                "engagement_count": len(uids)
+            }},
+            projection={"_id": 0, "id": 1, "engagement_version": 1, "engagement_storage": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous_post is None:
+            # The post was deleted while its engagements were being staged
+            await db.post_engagers.delete_many({"post_id": post_id, "upload_version": upload_version})
+            raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
+        
+        analysis_cache.invalidate_post(post_id)
+        export_cache.invalidate_post(post_id)
+        
+        # The previous version is still stored until it is collected, so the rollups can be diffed against it
+        previous_engagers = (await load_post_engagers([previous_post]))[post_id]
+        engagers = set((await username_dictionary.usernames(uids.tolist())).values())
+        await apply_rollup_diff(
+            post["platform"],
+            rollup_day(post["post_date"]),
+            engagers - previous_engagers,
+            previous_engagers - engagers
+        )
+    
+    previous_version = previous_post.get("engagement_version")
+    if previous_version is None:
+        superseded = {"post_id": post_id, "upload_version": {"$ne": upload_version}}
+    else:
+        superseded = {"post_id": post_id, "upload_version": previous_version}
+    run_in_background(collect_superseded_engagements(superseded))
+
+async def collect_superseded_engagements(superseded: Dict[str, Any]):
+    try:
+        delete_result = await db.engagements.delete_many(superseded)
+        packed_result = await db.post_engagers.delete_many(superseded)
+        logger.info(f"Collected {delete_result.deleted_count} superseded engagements and {packed_result.deleted_count} packed sets of post {superseded['post_id']}")
+    except Exception as e:
+        logger.error(f"Collecting superseded engagements failed: {str(e)}")
+
+async def collect_orphaned_engagements():
+    """Remove staged data of uploads that never became active, e.g. after a crash mid-upload"""
+    staged_before = datetime.utcnow() - ENGAGEMENT_STAGING_GRACE
+    collected = 0
+    try:
+        async for post in db.posts.find({"engagement_version": {"$ne": None}}, {"_id": 0, "id": 1, "engagement_version": 1}):
+            orphaned = {
+                "post_id": post["id"],
+                "upload_version": {"$ne": post["engagement_version"]},
+                "created_at": {"$lt": staged_before}
+            }
+            delete_result = await db.engagements.delete_many(orphaned)
+            packed_result = await db.post_engagers.delete_many(orphaned)
+            collected += delete_result.deleted_count + packed_result.deleted_count
+        logger.info(f"Collected {collected} orphaned staged engagements")
+    except Exception as e:
+        logger.error(f"Collecting orphaned engagements failed: {str(e)}")
+
+async def process_engagement_upload(post: Dict[str, Any], file: UploadFile, job: Optional[UploadJob] = None) -> Dict[str, Any]:
+    logger.info(f"Starting engagement upload for post: {post['title']}")
+    if job:
+        await job.advance(phase="parsing")
+    
+    # Usernames are interned batch by batch; the post keeps its previous engagers
+    # until the packed set of the new upload is stored and the post is flipped to it
+    uid_batches = []
+    rows_parsed = 0
+    sample_usernames = []
+    async with aclosing(stream_upload_usernames(file)) as batches:
+        async for usernames in batches:
+            if not usernames:
+                continue
+            with timed_stage("intern"):
+                uid_batches.append(await username_dictionary.intern(usernames))
+            rows_parsed += len(usernames)
+            sample_usernames.extend(usernames[:5 - len(sample_usernames)])
+            if job:
+                await job.advance(rows_parsed=rows_parsed)
+    
+    if rows_parsed == 0:
+        raise HTTPException(status_code=400, detail="Dosya işlenirken hata: Dosyada geçerli kullanıcı adı bulunamadı")
+    
+    uids = np.unique(np.concatenate(uid_batches))
+    with timed_stage("mongo_insert"):
+        upload_version = await stage_packed_engagers(post, uids)
+    
+    if job:
+        await job.advance(phase="replacing", rows_inserted=len(uids))
+    with timed_stage("activate"):
+        await activate_engagement_version(post, upload_version, uids)
+    
+    logger.info(f"Uploaded {len(uids)} distinct engagements for post from {rows_parsed} rows")
+    
+    return {
+        "success": True,
+        "message": f"{len(uids)} etkileşim başarıyla yüklendi",
+        "count": len(uids),
+        "sample_users": sample_usernames  # Show first 5 as sample
+    }
+
 @api_router.post("/engagements/upload")
 async def upload_engagement(
     post_id: str = Form(...),
     file: UploadFile = File(...),
+    async_job: bool = Form(False),
     _: str = Depends(authenticate_admin)
 ):
     # Check if post exists
@@ -312,137 +2210,163 @@ async def upload_engagement(
     if not post:
         raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
     
-    logger.info(f"Starting engagement upload for post: {post['title']}")
-    
-    content = await file.read()
-    usernames = process_csv_excel_file(content, file.content_type)
+    if async_job:
+        return await start_upload_job("engagements", file, lambda upload, job: process_engagement_upload(post, upload, job))
     
-    logger.info(f"Processed {len(usernames)} engagement usernames")
-    
-    # Clear existing engagements for this post
-    delete_result = await db.engagements.delete_many({"post_id": post_id})
-    logger.info(f"Deleted {delete_result.deleted_count} existing engagements for post")
+    return await process_engagement_upload(post, file)
+
+# Upload Job Routes
+@api_router.get("/uploads/jobs/{job_id}", response_model=UploadJob)
+async def get_upload_job(job_id: str, _: str = Depends(authenticate_admin)):
+    job = await load_upload_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Yükleme işi bulunamadı")
+    return job
+
+@api_router.get("/uploads/jobs/{job_id}/events")
+async def stream_upload_job(job_id: str, _: str = Depends(authenticate_admin)):
+    job = await load_upload_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Yükleme işi bulunamadı")
     
-    # Insert new engagements
-    engagements_to_insert = []
-    for username in usernames:
-        if username:  # Only add if normalization didn't result in empty string
-            engagement = Engagement(
-                post_id=post_id,
-                username=username,
-                platform=post["platform"]
-            )
-            engagements_to_insert.append(engagement.dict())
+    return StreamingResponse(
+        upload_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/engagements/analysis/batch")
+async def analyze_engagement_batch(request: BatchAnalysisRequest, _: str = Depends(authenticate_admin)):
+    post_ids = list(dict.fromkeys(request.post_ids))
+    posts = await db.posts.find({"id": {"$in": post_ids}}, {"_id": 0}).to_list(None)
+    analyses = await batch_engagement_analyses(posts)
     
-    if engagements_to_insert:
-        insert_result = await db.engagements.insert_many(engagements_to_insert)
-        logger.info(f"Inserted {len(insert_result.inserted_ids)} new engagements")
+    # Keep the requested order; summary mode leaves out the username lists
+    results = []
+    for post_id in post_ids:
+        if post_id not in analyses:
+            continue
+        analysis = analyses[post_id]
+        if request.summary_only:
+            analysis = EngagementAnalysisSummary(**analysis.dict(exclude={"engaged_users", "not_engaged_users"}))
+        results.append(analysis)
     
     return {
-        "success": True,
-        "message": f"{len(engagements_to_insert)} etkileşim başarıyla yüklendi",
-        "count": len(engagements_to_insert),
-        "sample_users": usernames[:5]  # Show first 5 as sample
+        "analyses": results,
+        "not_found": [post_id for post_id in post_ids if post_id not in analyses]
     }
 
-@api_router.get("/engagements/analysis/{post_id}", response_model=EngagementAnalysis)
-async def analyze_engagement(post_id: str, _: str = Depends(authenticate_admin)):
+@api_router.get("/engagements/analysis/{post_id}", response_model=EngagementAnalysis, response_class=ORJSONResponse)
+async def analyze_engagement(post_id: str, format: str = "json", _: str = Depends(authenticate_admin)):
+    check_response_format(format)
     # Get post
     post = await db.posts.find_one({"id": post_id})
     if not post:
         raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
     
-    # Get management users for this platform
-    management_users = await db.users.find({"platform": post["platform"]}).to_list(1000)
-    management_usernames = [user["username"] for user in management_users]
-    
-    # Get engagements for this post
-    engagements = await db.engagements.find({"post_id": post_id}).to_list(1000)
-    engaged_usernames = [eng["username"] for eng in engagements]
-    
-    # Detailed debug logging
-    logger.info(f"=== ANALYSIS DEBUG ===")
-    logger.info(f"Post: {post['title']} ({post['platform']})")
-    logger.info(f"Management users count: {len(management_usernames)}")
-    logger.info(f"Management users sample: {management_usernames[:5]}")
-    logger.info(f"Engaged users count: {len(engaged_usernames)}")
-    logger.info(f"Engaged users sample: {engaged_usernames[:5]}")
-    
-    # Calculate analysis with exact string matching
-    total_management = len(management_usernames)
-    engaged_users = []
-    not_engaged_users = []
-    
-    # Use set for faster lookup
-    engaged_set = set(engaged_usernames)
-    
-    for username in management_usernames:
-        if username in engaged_set:
-            engaged_users.append(username)
-            logger.debug(f"MATCH: {username}")
-        else:
-            not_engaged_users.append(username)
-            logger.debug(f"NO_MATCH: {username}")
-    
-    logger.info(f"Final results - Engaged: {len(engaged_users)}, Not Engaged: {len(not_engaged_users)}")
-    
-    engagement_percentage = (len(engaged_users) / total_management * 100) if total_management > 0 else 0
+    if format == "ndjson":
+        # One row per roster user straight from the roster cursor, nothing buffered
+        return ndjson_response(
+            {"username": username, "engaged": engaged}
+            async for username, engaged in roster_engagement_rows(post)
+        )
     
-    return EngagementAnalysis(
-        post_id=post_id,
-        post_title=post["title"],
-        platform=post["platform"],
-        total_management=total_management,
-        total_engaged=len(engaged_users),
-        engagement_percentage=round(engagement_percentage, 2),
-        engaged_users=engaged_users,
-        not_engaged_users=not_engaged_users
-    )
+    analysis = await cached_engagement_analysis(post)
+    return ORJSONResponse(analysis.dict())
 
 @api_router.get("/reports/weekly")
 async def get_weekly_report(_: str = Depends(authenticate_admin)):
-    # Get all posts from last week
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    posts = await db.posts.find({"created_at": {"$gte": week_ago}}).to_list(100)
+    week_start, week_end = weekly_report_window()
+    with timed_stage("mongo_posts"):
+        posts_per_platform = await count_posts_per_platform(week_start, week_end)
     
     # Get all users
-    all_users = await db.users.find().to_list(1000)
+    with timed_stage("mongo_users"):
+        all_users = await db.users.find(await active_rosters_query(), {"_id": 0, "username": 1, "platform": 1}).to_list(None)
     
-    report_data = []
-    for user in all_users:
-        user_engagement_count = 0
-        total_posts_for_platform = len([p for p in posts if p["platform"] == user["platform"]])
-        
-        for post in posts:
-            if post["platform"] == user["platform"]:
-                engagement = await db.engagements.find_one({
-                    "post_id": post["id"], 
-                    "username": user["username"]
-                })
-                if engagement:
-                    user_engagement_count += 1
-        
-        engagement_rate = (user_engagement_count / total_posts_for_platform * 100) if total_posts_for_platform > 0 else 0
-        
-        report_data.append({
-            "username": user["username"],
-            "platform": user["platform"],
-            "engaged_posts": user_engagement_count,
-            "total_posts": total_posts_for_platform,
-            "engagement_rate": round(engagement_rate, 2)
-        })
+    # Engaged post counts are range sums over the daily rollups
+    with timed_stage("mongo_rollups"):
+        engaged_counts = await sum_rollups(week_start, week_end)
+    with timed_stage("report"):
+        report_data = build_engagement_report(all_users, posts_per_platform, engaged_counts)
     
     return {
         "period": "Son 7 gün",
         "users": report_data,
         "summary": {
             "total_users": len(all_users),
-            "total_posts": len(posts),
+            "total_posts": sum(posts_per_platform.values()),
             "active_users": len([u for u in report_data if u["engaged_posts"] > 0])
         }
     }
 
-@api_router.get("/debug/normalization/{post_id}")
+@api_router.get("/reports/range")
+async def get_range_report(
+    start: datetime,
+    end: datetime,
+    platform: str,
+    bucket: str = "week",
+    _: str = Depends(authenticate_admin)
+):
+    """Per-user engagement time series for the posts dated between start and end, both days included"""
+    if platform not in ["instagram", "x"]:
+        raise HTTPException(status_code=400, detail="Platform instagram ya da x olmalıdır")
+    if bucket not in REPORT_BUCKETS:
+        raise HTTPException(status_code=400, detail="Aralık day, week ya da month olmalıdır")
+    
+    range_start = rollup_day(start)
+    range_end = rollup_day(end) + timedelta(days=1)
+    if range_start >= range_end:
+        raise HTTPException(status_code=400, detail="Başlangıç tarihi bitiş tarihinden sonra olamaz")
+    
+    buckets = bucket_starts(range_start, range_end, bucket)
+    
+    # Both pipelines match on the (platform, post_date) and (platform, day, username) indexes and
+    # bucket in Mongo, so only one row per bucket and per user and bucket comes back
+    post_counts = db.posts.aggregate([
+        {"$match": {"platform": platform, "post_date": {"$gte": range_start, "$lt": range_end}}},
+        {"$group": {"_id": bucket_start_expression("post_date", bucket), "posts": {"$sum": 1}}}
+    ])
+    rollups = db.engagement_rollups.aggregate([
+        {"$match": {"platform": platform, "day": {"$gte": range_start, "$lt": range_end}}},
+        {"$group": {
+            "_id": {"username": "$username", "bucket": bucket_start_expression("day", bucket)},
+            "engaged_posts": {"$sum": "$engaged_posts"}
+        }}
+    ], batchSize=ROSTER_BATCH_SIZE)
+    management_usernames = await load_roster_usernames(platform)
+    
+    report = build_range_report(
+        management_usernames, platform, buckets, await post_counts.to_list(None), await rollups.to_list(None)
+    )
+    
+    return {
+        "period": f"{range_start.date().isoformat()} - {(range_end - timedelta(days=1)).date().isoformat()}",
+        "platform": platform,
+        "bucket": bucket,
+        **report
+    }
+
+@api_router.get("/analytics/matrix")
+async def get_engagement_matrix(
+    platform: str,
+    post_ids: Optional[List[str]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    last: Optional[int] = Query(None, ge=1, le=500),
+    top_k: int = Query(10, ge=1, le=1000),
+    min_missed: Optional[int] = Query(None, ge=1),
+    _: str = Depends(authenticate_admin)
+):
+    """Engagement matrix of a platform's roster over chosen posts, a date range or the latest posts"""
+    posts, management_usernames, matrix = await compute_engagement_matrix(platform, post_ids, start, end, last)
+    
+    return {
+        "platform": platform,
+        **summarize_engagement_matrix(matrix, management_usernames, posts, top_k, min_missed)
+    }
+
+@api_router.get("/debug/normalization/{post_id}", response_class=ORJSONResponse)
 async def debug_normalization(post_id: str, _: str = Depends(authenticate_admin)):
     """Debug endpoint to check username normalization and matching"""
     
@@ -452,14 +2376,12 @@ async def debug_normalization(post_id: str, _: str = Depends(authenticate_admin)
         raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
     
     # Get management users
-    management_users = await db.users.find({"platform": post["platform"]}).to_list(1000)
+    management_usernames = await load_roster_usernames(post["platform"])
     
     # Get engagement users
-    engagements = await db.engagements.find({"post_id": post_id}).to_list(1000)
+    engagement_usernames = sorted((await load_post_engagers([post]))[post_id])
     
     # Detailed comparison
-    management_usernames = [user["username"] for user in management_users]
-    engagement_usernames = [eng["username"] for eng in engagements]
     
     # Find exact matches and mismatches
     matches = []
@@ -477,7 +2399,7 @@ async def debug_normalization(post_id: str, _: str = Depends(authenticate_admin)
     mgmt_set = set(management_usernames)
     extra_engagements = [eng for eng in engagement_usernames if eng not in mgmt_set]
     
-    return {
+    return ORJSONResponse({
         "post_title": post["title"],
         "platform": post["platform"],
         "management_users": {
@@ -504,19 +2426,43 @@ async def debug_normalization(post_id: str, _: str = Depends(authenticate_admin)
                 "users": extra_engagements
             }
         }
-    }
-@api_router.get("/export/pdf/{post_id}")
-async def export_analysis_pdf(post_id: str, _: str = Depends(authenticate_admin)):
-    analysis = await analyze_engagement(post_id)
+    })
+def user_table_pages(usernames: List[str], rows: int = PDF_USER_TABLE_ROWS, columns: int = PDF_USER_TABLE_COLUMNS) -> Iterator[List[List[str]]]:
+    """Lay out numbered usernames row by row in tables of at most rows x columns cells"""
+    per_table = rows * columns
+    for table_start in range(0, len(usernames), per_table):
+        chunk = usernames[table_start:table_start + per_table]
+        table_rows = []
+        for row_start in range(0, len(chunk), columns):
+            cells = [
+                f"{table_start + row_start + offset + 1}. {username}"
+                for offset, username in enumerate(chunk[row_start:row_start + columns])
+            ]
+            table_rows.append(cells + [''] * (columns - len(cells)))
+        yield table_rows
+
+def draw_page_number(canvas, doc):
+    from reportlab.lib.pagesizes import A4
+    
+    canvas.saveState()
+    canvas.setFont('Helvetica', 8)
+    canvas.drawRightString(A4[0] - doc.rightMargin, doc.bottomMargin / 2, f"Sayfa {doc.page}")
+    canvas.restoreState()
+
+def render_analysis_pdf(analysis: EngagementAnalysis) -> io.BytesIO:
+    """Render the analysis summary and the full user lists as a PDF"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
     
-    # Create PDF
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
     story = []
     
     # Title
-    title = Paragraph(f"Etkileşim Analizi: {analysis.post_title}", styles['Title'])
+    title = Paragraph(f"Etkileşim Analizi: {escape(analysis.post_title)}", styles['Title'])
     story.append(title)
     story.append(Spacer(1, 20))
     
@@ -543,11 +2489,398 @@ async def export_analysis_pdf(post_id: str, _: str = Depends(authenticate_admin)
     story.append(summary_table)
     story.append(Spacer(1, 30))
     
+    # User lists, split into page-sized tables so large rosters never form one giant table
+    user_table_style = TableStyle([
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE')
+    ])
+    column_width = (A4[0] - doc.leftMargin - doc.rightMargin) / PDF_USER_TABLE_COLUMNS
+    
+    for heading, usernames in [
+        ("Etkileşim Yapanlar", analysis.engaged_users),
+        ("Etkileşim Yapmayanlar", analysis.not_engaged_users)
+    ]:
+        story.append(Paragraph(f"{heading} ({len(usernames)})", styles['Heading2']))
+        if not usernames:
+            story.append(Paragraph("Kullanıcı yok", styles['Normal']))
+        for table_rows in user_table_pages(usernames):
+            user_table = Table(table_rows, colWidths=[column_width] * PDF_USER_TABLE_COLUMNS)
+            user_table.setStyle(user_table_style)
+            story.append(user_table)
+        story.append(Spacer(1, 20))
+    
     # Build PDF
-    doc.build(story)
+    doc.build(story, onFirstPage=draw_page_number, onLaterPages=draw_page_number)
     buffer.seek(0)
+    return buffer
+
+async def stream_csv(header: List[str], rows: AsyncIterator[List[Any]]) -> AsyncIterator[bytes]:
+    """Encode rows as CSV a batch at a time; the BOM lets Excel detect UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    
+    pending_rows = 0
+    async for row in rows:
+        writer.writerow(row)
+        pending_rows += 1
+        if pending_rows >= EXPORT_ROW_BATCH_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending_rows = 0
+    
+    yield buffer.getvalue().encode('utf-8')
+
+def write_xlsx_rows(worksheet, first_row: int, rows: List[List[Any]]):
+    for offset, row in enumerate(rows):
+        worksheet.write_row(first_row + offset, 0, row)
+
+async def write_xlsx(path: str, sheet_name: str, header: List[str], rows: AsyncIterator[List[Any]]):
+    """Write rows to an XLSX file in constant_memory mode, flushing batches on the export pool"""
+    import xlsxwriter
+    
+    loop = asyncio.get_running_loop()
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, header, workbook.add_format({'bold': True}))
+        
+        next_row = 1
+        batch = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= EXPORT_ROW_BATCH_SIZE:
+                await loop.run_in_executor(export_executor, write_xlsx_rows, worksheet, next_row, batch)
+                next_row += len(batch)
+                batch = []
+        if batch:
+            await loop.run_in_executor(export_executor, write_xlsx_rows, worksheet, next_row, batch)
+    finally:
+        await loop.run_in_executor(export_executor, workbook.close)
+
+async def write_export_file(path: Path, export_format: str, sheet_name: str, header: List[str], rows: AsyncIterator[List[Any]]):
+    if export_format == "csv":
+        with open(path, 'wb') as output:
+            async for chunk in stream_csv(header, rows):
+                output.write(chunk)
+    else:
+        await write_xlsx(str(path), sheet_name, header, rows)
+
+async def export_response(export_format: str, filename: str, sheet_name: str, header: List[str], rows: AsyncIterator[List[Any]]):
+    """Stream rows as a CSV download or hand them out as a constant-memory XLSX file"""
+    if export_format == "csv":
+        return StreamingResponse(
+            stream_csv(header, rows),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+        )
+    
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        await write_xlsx(path, sheet_name, header, rows)
+    except Exception:
+        os.remove(path)
+        raise
+    
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=f"{filename}.xlsx", background=BackgroundTask(os.remove, path))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+async def cached_export_response(
+    post: Dict[str, Any],
+    export_format: str,
+    if_none_match: Optional[str],
+    render: Callable[[Path], Any]
+) -> Response:
+    """Serve a post export from the artifact cache, rendering it once per data version.
+    
+    `render` writes the artifact to the given path; it only runs on a cache miss.
+    """
+    data_version = (post.get("engagement_version"), await get_roster_version(post["platform"]))
+    name = export_cache.artifact_name(post["id"], export_format, data_version)
+    etag = export_cache.etag(name)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    path = export_cache.get(name)
+    if path is None:
+        temporary_path = export_cache.reserve()
+        try:
+            await render(temporary_path)
+        except Exception:
+            temporary_path.unlink(missing_ok=True)
+            raise
+        path = export_cache.admit(name, temporary_path)
+    
+    return FileResponse(
+        path,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        filename=f"analiz-{post['id']}.{export_format}",
+        headers=headers
+    )
+
+def check_export_format(export_format: str):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Dosya biçimi csv ya da xlsx olmalıdır")
+
+async def analysis_export_rows(post: Dict[str, Any]) -> AsyncIterator[List[Any]]:
+    async for username, engaged in roster_engagement_rows(post):
+        yield [username, "Evet" if engaged else "Hayır"]
+
+async def weekly_report_export_rows() -> AsyncIterator[List[Any]]:
+    week_start, week_end = weekly_report_window()
+    posts_per_platform = await count_posts_per_platform(week_start, week_end)
+    engaged_counts = await sum_rollups(week_start, week_end)
+    
+    cursor = db.users.find(await active_rosters_query(), {"_id": 0, "username": 1, "platform": 1}).batch_size(ROSTER_BATCH_SIZE)
+    async for user in cursor:
+        row = engagement_report_row(user, posts_per_platform, engaged_counts)
+        yield [row["username"], row["platform"], row["engaged_posts"], row["total_posts"], row["engagement_rate"]]
+
+async def matrix_export_rows(summary: Dict[str, Any], matrix: np.ndarray) -> AsyncIterator[List[Any]]:
+    for user, engaged_row in zip(summary["users"], matrix.astype(np.uint8).tolist()):
+        yield [
+            user["username"],
+            *engaged_row,
+            user["engaged_posts"],
+            user["missed_posts"],
+            user["longest_missed_streak"],
+            user["current_missed_streak"]
+        ]
+
+def write_pdf_file(path: Path, analysis: EngagementAnalysis):
+    with open(path, 'wb') as output:
+        output.write(render_analysis_pdf(analysis).getbuffer())
+
+@api_router.get("/export/pdf/{post_id}")
+async def export_analysis_pdf(
+    post_id: str,
+    if_none_match: Optional[str] = Header(None),
+    _: str = Depends(authenticate_admin)
+):
+    post = await db.posts.find_one({"id": post_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
+    
+    async def render(path: Path):
+        with timed_stage("analysis"):
+            analysis = await cached_engagement_analysis(post)
+        # reportlab is CPU bound; render on the export pool so the event loop keeps serving
+        with timed_stage("render"):
+            await asyncio.get_running_loop().run_in_executor(export_executor, write_pdf_file, path, analysis)
+    
+    return await cached_export_response(post, "pdf", if_none_match, render)
+
+@api_router.get("/export/analysis/{post_id}")
+async def export_analysis_table(
+    post_id: str,
+    format: str = "xlsx",
+    if_none_match: Optional[str] = Header(None),
+    _: str = Depends(authenticate_admin)
+):
+    check_export_format(format)
+    post = await db.posts.find_one({"id": post_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Gönderi bulunamadı")
+    
+    async def render(path: Path):
+        await write_export_file(path, format, "Analiz", ["Kullanıcı", "Etkileşim"], analysis_export_rows(post))
+    
+    return await cached_export_response(post, format, if_none_match, render)
+
+@api_router.get("/export/weekly")
+async def export_weekly_report(format: str = "xlsx", _: str = Depends(authenticate_admin)):
+    check_export_format(format)
+    header = ["Kullanıcı", "Platform", "Etkileşim Yapılan", "Toplam Gönderi", "Etkileşim Oranı"]
+    return await export_response(format, "haftalik-rapor", "Haftalık Rapor", header, weekly_report_export_rows())
+
+@api_router.get("/export/matrix")
+async def export_engagement_matrix(
+    platform: str,
+    post_ids: Optional[List[str]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    last: Optional[int] = Query(None, ge=1, le=500),
+    format: str = "xlsx",
+    _: str = Depends(authenticate_admin)
+):
+    check_export_format(format)
+    posts, management_usernames, matrix = await compute_engagement_matrix(platform, post_ids, start, end, last)
+    summary = summarize_engagement_matrix(matrix, management_usernames, posts, top_k=0)
+    
+    header = [
+        "Kullanıcı",
+        *[f"{post['post_date'].date().isoformat()} {post['title']}" for post in posts],
+        "Etkileşim",
+        "Kaçırılan",
+        "En Uzun Kaçırma Serisi",
+        "Güncel Kaçırma Serisi"
+    ]
+    return await export_response(format, f"matris-{platform}", "Matris", header, matrix_export_rows(summary, matrix))
+
+# Admin Routes
+@api_router.get("/admin/admins")
+async def get_admins(_: str = Depends(authenticate_admin)):
+    return await db.admins.find({}, {"_id": 0, "password_hash": 0}).sort("username", ASCENDING).to_list(None)
+
+@api_router.post("/admin/admins")
+async def add_admin(admin_data: AdminCreate, _: str = Depends(authenticate_admin)):
+    if not admin_data.username.strip() or len(admin_data.password) < 8:
+        raise HTTPException(status_code=400, detail="Kullanıcı adı boş olamaz, şifre en az 8 karakter olmalıdır")
+    if len(admin_data.password.encode('utf-8')) > 72:
+        raise HTTPException(status_code=400, detail="Şifre en fazla 72 bayt olabilir")
+    
+    password_hash = await asyncio.get_running_loop().run_in_executor(None, hash_password, admin_data.password)
+    admin = Admin(username=admin_data.username.strip(), password_hash=password_hash)
+    result = await db.admins.update_one(
+        {"username": admin.username},
+        {"$setOnInsert": admin.dict()},
+        upsert=True
+    )
+    if result.upserted_id is None:
+        raise HTTPException(status_code=400, detail="Bu yönetici zaten mevcut")
+    
+    return {"id": admin.id, "username": admin.username, "created_at": admin.created_at}
+
+@api_router.delete("/admin/admins/{admin_id}")
+async def delete_admin(admin_id: str, _: str = Depends(authenticate_admin)):
+    # Issued tokens stay valid until they expire; keep at least one account to log in with
+    if await db.admins.count_documents({}) <= 1:
+        raise HTTPException(status_code=400, detail="Son yönetici silinemez")
+    
+    result = await db.admins.delete_one({"id": admin_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Yönetici bulunamadı")
+    
+    return {"message": "Yönetici silindi"}
+
+@api_router.get("/admin/indexes")
+async def get_index_stats(_: str = Depends(authenticate_admin)):
+    """Report declared indexes and how often each one has been used since the server started"""
+    collections = {}
+    for collection_name, index_models in INDEX_SPECS.items():
+        usage = []
+        async for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+            usage.append({
+                "name": stats["name"],
+                "key": dict(stats["key"]),
+                "ops": stats["accesses"]["ops"],
+                "since": stats["accesses"]["since"]
+            })
+        
+        collections[collection_name] = {
+            "declared": [model.document["name"] for model in index_models],
+            "indexes": sorted(usage, key=lambda index: index["name"])
+        }
+    
+    return {"collections": collections}
+
+@api_router.get("/admin/parse-pool")
+async def get_parse_pool_stats(_: str = Depends(authenticate_admin)):
+    """Report upload parsing concurrency and queue depth"""
+    return parse_pool.stats()
+
+@api_router.post("/admin/migrations/packed-engagements")
+async def migrate_packed_engagements(_: str = Depends(authenticate_admin)):
+    """Convert the engagement rows of every post into a packed id set as a background job"""
+    return await start_job("migration", pack_stored_engagements, "Etkileşimler arka planda dönüştürülüyor")
+
+async def pack_stored_engagements(job: UploadJob) -> Dict[str, Any]:
+    await job.advance(phase="migrating")
+    migrated_posts = 0
+    migrated_engagements = 0
+    
+    async for post in db.posts.find({"engagement_storage": {"$ne": "packed"}}, {"_id": 0}):
+        engagers = (await load_post_engagers([post]))[post["id"]]
+        if not engagers:
+            continue
+        
+        uids = await username_dictionary.intern(sorted(engagers))
+        upload_version = await stage_packed_engagers(post, uids)
+        await activate_engagement_version(post, upload_version, uids)
+        
+        migrated_posts += 1
+        migrated_engagements += len(engagers)
+        await job.advance(rows_parsed=migrated_posts, rows_inserted=migrated_engagements)
+    
+    logger.info(f"Migrated {migrated_engagements} engagements of {migrated_posts} posts to packed storage")
+    
+    return {
+        "message": f"{migrated_posts} gönderinin etkileşimleri dönüştürüldü",
+        "migrated_posts": migrated_posts,
+        "migrated_engagements": migrated_engagements
+    }
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_engagement_rollups(_: str = Depends(authenticate_admin)):
+    """Recompute the daily per-user rollups from the stored engagements"""
+    rollup_count = await rebuild_rollups()
+    if rollup_count is None:
+        raise HTTPException(status_code=409, detail="Günlük özetler şu anda yeniden oluşturuluyor")
+    return {"message": f"{rollup_count} günlük özet yeniden oluşturuldu", "rollups": rollup_count}
+
+@api_router.get("/admin/analysis-cache")
+async def get_analysis_cache_stats(_: str = Depends(authenticate_admin)):
+    """Report analysis cache size and hit/miss counters"""
+    return analysis_cache.stats()
+
+@api_router.get("/admin/export-cache")
+async def get_export_cache_stats(_: str = Depends(authenticate_admin)):
+    """Report export artifact cache size on disk and hit/miss counters"""
+    return export_cache.stats()
+
+@api_router.get("/metrics")
+async def get_metrics(_: None = Depends(authenticate_metrics_scraper)):
+    """Request and stage latency histograms in the Prometheus text format"""
+    lines = request_latency.render() + stage_latency.render()
+    return Response(content="\n".join(lines) + "\n", media_type=METRICS_MEDIA_TYPE)
+
+class TimingMiddleware:
+    """Observe each request's latency per route and add its stage timings as a Server-Timing header.
+    
+    The header goes out with the response start, so its total is the time to the first byte;
+    the histogram is observed once the whole body has been sent.
+    """
     
-    return {"pdf_data": buffer.getvalue().hex()}
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        status_code = 500
+        
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header(timings, time.perf_counter() - started))
+            await send(message)
+        
+        token = request_stage_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stage_timings.reset(token)
+            # The matched route template keeps the label set bounded; unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_latency.observe((scope["method"], route_path, str(status_code)), time.perf_counter() - started)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -558,8 +2891,12 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Added last so it wraps CORS and times the whole request
+app.add_middleware(TimingMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -567,6 +2904,72 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_indexes():
+    for collection_name, index_models in INDEX_SPECS.items():
+        try:
+            created = await db[collection_name].create_indexes(index_models)
+            logger.info(f"Ensured indexes on {collection_name}: {created}")
+        except Exception as e:
+            # A conflicting or failed index must not keep the API from starting
+            logger.error(f"Index creation failed on {collection_name}: {str(e)}")
+    
+    for collection_name, index_names in SUPERSEDED_INDEXES.items():
+        try:
+            existing = await db[collection_name].index_information()
+            for index_name in index_names:
+                if index_name in existing:
+                    await db[collection_name].drop_index(index_name)
+                    logger.info(f"Dropped superseded index {index_name} on {collection_name}")
+        except Exception as e:
+            logger.error(f"Dropping superseded indexes failed on {collection_name}: {str(e)}")
+
+@app.on_event("startup")
+async def version_rosters():
+    # Awaited before serving and before the orphan sweep, which only spares the active version
+    await adopt_unversioned_rosters()
+
+@app.on_event("startup")
+async def prepare_authentication():
+    # Without a signing key no token can be issued or checked, so a failure here stops the startup
+    await load_jwt_secret()
+    
+    if await db.admins.count_documents({}, limit=1):
+        return
+    password_hash = await asyncio.get_running_loop().run_in_executor(None, hash_password, ADMIN_PASSWORD)
+    admin = Admin(username=ADMIN_USERNAME, password_hash=password_hash)
+    await db.admins.update_one({"username": admin.username}, {"$setOnInsert": admin.dict()}, upsert=True)
+    logger.info(f"Seeded admin account {admin.username}")
+
+def preload_modules():
+    for module_name in WARMUP_MODULES:
+        importlib.import_module(module_name)
+    # The normalization patterns are compiled at import; one pass runs pandas' string accessor setup too
+    normalize_username_values([" @Warm.Up_ "])
+
+async def warm_up():
+    started = datetime.utcnow()
+    try:
+        await client.admin.command('ping')
+    except Exception as e:
+        logger.error(f"Warm-up could not reach MongoDB: {str(e)}")
+    await asyncio.get_running_loop().run_in_executor(None, preload_modules)
+    logger.info(f"Warm-up finished in {(datetime.utcnow() - started).total_seconds():.2f}s")
+
+@app.on_event("startup")
+async def schedule_warm_up():
+    # Runs in the background so the worker accepts requests (e.g. /api/login) right away
+    if WARMUP_ON_STARTUP:
+        run_in_background(warm_up())
+
+@app.on_event("startup")
+async def schedule_engagement_maintenance():
+    run_in_background(collect_orphaned_engagements())
+    run_in_background(collect_orphaned_rosters())
+    run_in_background(ensure_rollups())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    parse_pool.executor.shutdown(wait=False, cancel_futures=True)
+    export_executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -31,10 +31,26 @@ print(f"Testing backend at: {BASE_URL}")
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 
+class TokenAuth(requests.auth.AuthBase):
+    """Log in once with the admin credentials and send the issued bearer token"""
+    
+    def __init__(self, username, password):
+        self.credentials = (username, password)
+        self.token = None
+    
+    def __call__(self, request):
+        if self.token is None:
+            response = requests.post(f"{BASE_URL}/login", auth=self.credentials)
+            response.raise_for_status()
+            self.token = response.json()["access_token"]
+        request.headers["Authorization"] = f"Bearer {self.token}"
+        return request
+
 class BackendTester:
     def __init__(self):
         self.session = requests.Session()
-        self.auth = (ADMIN_USERNAME, ADMIN_PASSWORD)
+        self.credentials = (ADMIN_USERNAME, ADMIN_PASSWORD)
+        self.auth = TokenAuth(ADMIN_USERNAME, ADMIN_PASSWORD)
         self.test_results = []
         self.created_user_ids = []
         self.created_post_ids = []
@@ -72,10 +88,10 @@ class BackendTester:
         
         try:
             # Test valid credentials
-            response = self.session.post(f"{BASE_URL}/login", auth=self.auth)
+            response = self.session.post(f"{BASE_URL}/login", auth=self.credentials)
             if response.status_code == 200:
                 data = response.json()
-                if data.get('username') == ADMIN_USERNAME:
+                if data.get('username') == ADMIN_USERNAME and data.get('access_token'):
                     self.log_test("Authentication - Valid Credentials", True, "Login successful with admin credentials")
                 else:
                     self.log_test("Authentication - Valid Credentials", False, "Login response missing username")
@@ -313,19 +329,14 @@ class BackendTester:
             
             response = self.session.get(f"{BASE_URL}/export/pdf/{post_id}", auth=self.auth)
             if response.status_code == 200:
-                result = response.json()
-                if 'pdf_data' in result and result['pdf_data']:
-                    # Try to decode the hex data to verify it's valid
-                    try:
-                        pdf_bytes = bytes.fromhex(result['pdf_data'])
-                        if pdf_bytes.startswith(b'%PDF'):
-                            self.log_test("PDF Export", True, f"Successfully generated PDF ({len(pdf_bytes)} bytes)")
-                        else:
-                            self.log_test("PDF Export", False, "PDF data doesn't start with PDF header")
-                    except ValueError:
-                        self.log_test("PDF Export", False, "PDF data is not valid hex")
+                content_type = response.headers.get('content-type', '')
+                pdf_bytes = response.content
+                if not content_type.startswith('application/pdf'):
+                    self.log_test("PDF Export", False, f"PDF export returned content type {content_type}")
+                elif pdf_bytes.startswith(b'%PDF'):
+                    self.log_test("PDF Export", True, f"Successfully generated PDF ({len(pdf_bytes)} bytes)")
                 else:
-                    self.log_test("PDF Export", False, f"PDF export response missing pdf_data: {result}")
+                    self.log_test("PDF Export", False, "PDF data doesn't start with PDF header")
             else:
                 self.log_test("PDF Export", False, f"PDF export failed with status {response.status_code}")
                 
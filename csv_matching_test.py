@@ -23,7 +23,23 @@ def get_backend_url():
     return "http://localhost:8001"
 
 BASE_URL = get_backend_url() + "/api"
-ADMIN_AUTH = ("admin", "admin123")
+
+class TokenAuth(requests.auth.AuthBase):
+    """Log in once with the admin credentials and send the issued bearer token"""
+    
+    def __init__(self, username, password):
+        self.credentials = (username, password)
+        self.token = None
+    
+    def __call__(self, request):
+        if self.token is None:
+            response = requests.post(f"{BASE_URL}/login", auth=self.credentials)
+            response.raise_for_status()
+            self.token = response.json()["access_token"]
+        request.headers["Authorization"] = f"Bearer {self.token}"
+        return request
+
+ADMIN_AUTH = TokenAuth("admin", "admin123")
 
 def create_test_csv_content(usernames):
     """Create CSV content for testing"""
@@ -10,12 +10,20 @@ ChartJS.register(ArcElement, Tooltip, Legend, CategoryScale, LinearScale, BarEle
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
-// Auth setup
+// Auth setup: credentials are sent once to /login, later requests carry the issued token
 const setupAuth = (username, password) => {
   const token = btoa(`${username}:${password}`);
   axios.defaults.headers.common['Authorization'] = `Basic ${token}`;
 };
 
+const setupTokenAuth = (accessToken) => {
+  axios.defaults.headers.common['Authorization'] = `Bearer ${accessToken}`;
+};
+
+const clearAuth = () => {
+  delete axios.defaults.headers.common['Authorization'];
+};
+
 function App() {
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [activeTab, setActiveTab] = useState('users');
@@ -34,6 +42,21 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [notification, setNotification] = useState({ show: false, message: '', type: 'success' });
 
+  // An expired token sends the admin back to the login form
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && !error.config?.url?.endsWith('/login')) {
+          clearAuth();
+          setIsLoggedIn(false);
+        }
+        return Promise.reject(error);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   // Notification system
   const showNotification = (message, type = 'success') => {
     setNotification({ show: true, message, type });
@@ -52,7 +75,8 @@ function App() {
       setLoginLoading(true);
       try {
         setupAuth(credentials.username, credentials.password);
-        await axios.post(`${API}/login`);
+        const response = await axios.post(`${API}/login`);
+        setupTokenAuth(response.data.access_token);
         setIsLoggedIn(true);
         showNotification('Başarıyla giriş yapıldı! Hoş geldiniz.', 'success');
         fetchUsers();
@@ -428,7 +452,7 @@ function App() {
               AK Parti Niğde Gençlik Kolları - Sosyal Medya Takip Sistemi
             </h1>
             <button
-              onClick={() => setIsLoggedIn(false)}
+              onClick={() => { clearAuth(); setIsLoggedIn(false); }}
               className="bg-red-500 text-white px-4 py-2 rounded hover:bg-red-600"
             >
               Çıkış Yap
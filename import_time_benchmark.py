@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark
+Measures how long a fresh interpreter takes to import backend/server.py (a worker's cold start)
+and reports the slowest imports and which of the lazily loaded modules got pulled in anyway
+"""
+
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+RUNS = 7
+TOP_IMPORTS = 15
+LAZY_MODULES = ["pandas", "openpyxl", "xlsxwriter", "reportlab", "passlib"]
+
+IMPORT_SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def import_server(extra_args=()):
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", IMPORT_SCRIPT],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+def slowest_top_level_imports():
+    # -X importtime writes one line per module to stderr: self and cumulative microseconds
+    stderr = import_server(["-X", "importtime"]).stderr
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # server itself is indented by one space, the modules it imports directly by three
+        if match and len(match.group(3)) == 3:
+            imports.append((int(match.group(2)), match.group(4)))
+    return sorted(imports, reverse=True)[:TOP_IMPORTS]
+
+def main():
+    timings = []
+    loaded_lazy_modules = ""
+    for _ in range(RUNS):
+        output = import_server().stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded_lazy_modules = output[1] if len(output) > 1 else ""
+    
+    print(f"import server over {RUNS} fresh interpreters")
+    print(f"  min    {min(timings) * 1000:8.1f}ms")
+    print(f"  median {statistics.median(timings) * 1000:8.1f}ms")
+    print(f"  max    {max(timings) * 1000:8.1f}ms")
+    print(f"lazy modules loaded at import: {loaded_lazy_modules or 'none'}")
+    
+    print("\nslowest direct imports (cumulative)")
+    for cumulative_us, module in slowest_top_level_imports():
+        print(f"  {cumulative_us / 1000:8.1f}ms  {module}")
+
+if __name__ == "__main__":
+    main()
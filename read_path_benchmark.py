@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Read Path Benchmark
+Compares building GET /users and GET /posts response bodies through Pydantic models
+with the trusted read path that serializes projected documents as they are
+"""
+
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from server import Post, User, post_response_row  # noqa: E402
+
+ROW_COUNTS = [1_000, 10_000, 100_000]
+REPEATS = 5
+
+def make_users(count):
+    created_at = datetime(2024, 5, 1)
+    return [
+        {"id": str(uuid.uuid4()), "username": f"user{i}", "platform": "instagram", "created_at": created_at}
+        for i in range(count)
+    ]
+
+def make_posts(count):
+    created_at = datetime(2024, 5, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Gönderi {i}",
+            "platform": "x",
+            "post_id": str(i),
+            "post_date": created_at - timedelta(hours=i),
+            "created_at": created_at,
+            "engagement_version": str(uuid.uuid4()),
+            "engagement_storage": "packed",
+            "engagement_count": i % 500
+        }
+        for i in range(count)
+    ]
+
+def users_validated_default_encoder(users):
+    # Path before the orjson change: per-row models, then FastAPI's encoder and json.dumps
+    return JSONResponse(jsonable_encoder([User(**user) for user in users])).body
+
+def users_validated_orjson(users):
+    return ORJSONResponse([User(**user).dict() for user in users]).body
+
+def users_trusted(users):
+    return ORJSONResponse(users).body
+
+def posts_validated(posts):
+    rows = []
+    for post in posts:
+        post_dict = Post(**post).dict()
+        post_dict["has_engagement_data"] = post["engagement_count"] > 0
+        post_dict["engagement_count"] = post["engagement_count"]
+        rows.append(post_dict)
+    return JSONResponse(jsonable_encoder(rows)).body
+
+def posts_trusted(posts):
+    return ORJSONResponse([post_response_row(post, post["engagement_count"]) for post in posts]).body
+
+def best_time(build, rows):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        build(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    cases = [
+        ("users", make_users, [
+            ("pydantic + jsonable_encoder", users_validated_default_encoder),
+            ("pydantic + orjson", users_validated_orjson),
+            ("trusted + orjson", users_trusted),
+        ]),
+        ("posts", make_posts, [
+            ("pydantic + jsonable_encoder", posts_validated),
+            ("trusted + orjson", posts_trusted),
+        ]),
+    ]
+    
+    print(f"{'endpoint':<8} {'rows':>8}  {'path':<28} {'best of ' + str(REPEATS):>12} {'speedup':>8}")
+    for endpoint, make_rows, paths in cases:
+        for count in ROW_COUNTS:
+            rows = make_rows(count)
+            baseline = None
+            for name, build in paths:
+                elapsed = best_time(build, rows)
+                baseline = baseline or elapsed
+                print(f"{endpoint:<8} {count:>8}  {name:<28} {elapsed * 1000:>10.1f}ms {baseline / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
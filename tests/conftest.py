@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py lives in backend/ and is imported as a top-level module
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Tokens are signed without the startup hook that loads the key from MongoDB
+os.environ.setdefault("JWT_SECRET", "test-signing-key")
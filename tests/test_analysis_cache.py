@@ -0,0 +1,41 @@
+from server import AnalysisCache, EngagementAnalysis
+
+
+def make_analysis(post_id):
+    return EngagementAnalysis(
+        post_id=post_id,
+        post_title="Gönderi",
+        platform="instagram",
+        total_management=0,
+        total_engaged=0,
+        engagement_percentage=0,
+        engaged_users=[],
+        not_engaged_users=[],
+    )
+
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = AnalysisCache(max_entries=2)
+    cache.put(("p1", "instagram", "v1", 0), make_analysis("p1"))
+    cache.put(("p2", "instagram", "v1", 0), make_analysis("p2"))
+
+    assert cache.get(("p1", "instagram", "v1", 0)).post_id == "p1"
+    cache.put(("p3", "instagram", "v1", 0), make_analysis("p3"))
+
+    assert cache.get(("p2", "instagram", "v1", 0)) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_invalidates_by_post_and_platform():
+    cache = AnalysisCache(max_entries=10)
+    cache.put(("p1", "instagram", "v1", 0), make_analysis("p1"))
+    cache.put(("p2", "instagram", "v1", 0), make_analysis("p2"))
+    cache.put(("p3", "x", "v1", 0), make_analysis("p3"))
+
+    cache.invalidate_post("p1")
+    cache.invalidate_platform("x")
+
+    assert list(cache.entries) == [("p2", "instagram", "v1", 0)]
+    assert cache.stats()["invalidations"] == 2
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from server import ACCESS_TOKEN_TTL, authenticate_admin, create_access_token, decode_access_token, hash_password, verify_password
+
+
+def test_access_token_round_trip():
+    assert decode_access_token(create_access_token("admin")) == "admin"
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token("admin", now=datetime.utcnow() - ACCESS_TOKEN_TTL - timedelta(minutes=1))
+
+    with pytest.raises(HTTPException) as exc_info:
+        decode_access_token(token)
+
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.headers == {"WWW-Authenticate": "Bearer"}
+
+
+def test_tampered_token_is_rejected():
+    header, payload, signature = create_access_token("admin").split(".")
+
+    with pytest.raises(HTTPException):
+        decode_access_token(f"{header}.{payload}.{signature[::-1]}")
+
+
+def test_password_hash_verification():
+    password_hash = hash_password("admin123")
+
+    assert verify_password("admin123", password_hash)
+    assert not verify_password("admin124", password_hash)
+    assert not verify_password("x" * 100, password_hash)
+
+
+def test_routes_require_a_bearer_token():
+    token = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token("admin"))
+
+    assert asyncio.run(authenticate_admin(token)) == "admin"
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(authenticate_admin(None))
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.headers == {"WWW-Authenticate": "Bearer"}
@@ -0,0 +1,16 @@
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def test_server_import_defers_parsers_and_exporters():
+    script = (
+        "import sys, server; "
+        "print(','.join(name for name in ['pandas', 'openpyxl', 'xlsxwriter', 'reportlab'] if name in sys.modules))"
+    )
+
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
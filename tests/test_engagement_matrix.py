@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import numpy as np
+
+from server import summarize_engagement_matrix
+
+POSTS = [
+    {"id": f"p{index}", "title": f"Gönderi {index}", "post_date": datetime(2024, 1, index + 1)}
+    for index in range(5)
+]
+
+
+def test_matrix_totals_and_streaks():
+    matrix = np.array([
+        [1, 1, 1, 1, 1],
+        [0, 0, 1, 0, 0],
+        [1, 0, 0, 0, 1],
+        [0, 0, 0, 0, 0],
+    ], dtype=bool)
+    usernames = ["ayse", "mehmet", "fatma", "ali"]
+
+    summary = summarize_engagement_matrix(matrix, usernames, POSTS, top_k=2, min_missed=3)
+
+    users = {user["username"]: user for user in summary["users"]}
+    assert users["ayse"]["engaged_posts"] == 5
+    assert users["mehmet"]["missed_posts"] == 4
+    assert users["mehmet"]["longest_missed_streak"] == 2
+    assert users["mehmet"]["current_missed_streak"] == 2
+    assert users["fatma"]["longest_missed_streak"] == 3
+    assert users["fatma"]["current_missed_streak"] == 0
+    assert users["ali"]["current_missed_streak"] == 5
+    assert [post["engaged"] for post in summary["posts"]] == [2, 1, 2, 1, 2]
+    assert [user["username"] for user in summary["least_engaged"]] == ["ali", "mehmet"]
+    assert summary["missed_at_least"]["users"] == ["mehmet", "fatma", "ali"]
+
+
+def test_matrix_without_posts():
+    summary = summarize_engagement_matrix(np.zeros((2, 0), dtype=bool), ["ayse", "ali"], [], top_k=5)
+
+    assert summary["total_posts"] == 0
+    assert summary["users"][0]["current_missed_streak"] == 0
+    assert summary["posts"] == []
@@ -0,0 +1,77 @@
+import os
+import time
+
+from server import ExportArtifactCache, etag_matches
+
+
+def admit_bytes(cache, name, payload):
+    temporary_path = cache.reserve()
+    temporary_path.write_bytes(payload)
+    return cache.admit(name, temporary_path)
+
+
+def test_artifact_name_changes_with_data_version():
+    first = ExportArtifactCache.artifact_name("p1", "pdf", ("v1", 0))
+
+    assert first == ExportArtifactCache.artifact_name("p1", "pdf", ("v1", 0))
+    assert first != ExportArtifactCache.artifact_name("p1", "pdf", ("v2", 0))
+    assert first != ExportArtifactCache.artifact_name("p1", "pdf", ("v1", 1))
+    assert first != ExportArtifactCache.artifact_name("p1", "xlsx", ("v1", 0))
+
+
+def test_cache_evicts_least_recently_used_files_by_size(tmp_path):
+    cache = ExportArtifactCache(tmp_path, max_bytes=25)
+    a, b, c = (ExportArtifactCache.artifact_name(post_id, "pdf", ("v1", 0)) for post_id in ["a", "b", "c"])
+
+    admit_bytes(cache, a, b"x" * 10)
+    admit_bytes(cache, b, b"x" * 10)
+    assert cache.get(a) is not None
+    admit_bytes(cache, c, b"x" * 10)
+
+    assert cache.get(b) is None
+    assert cache.get(a).read_bytes() == b"x" * 10
+    assert not (tmp_path / b).exists()
+    assert cache.stats()["bytes"] == 20
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_adopts_files_and_invalidates_posts(tmp_path):
+    name = ExportArtifactCache.artifact_name("p1", "csv", ("v1", 0))
+    admit_bytes(ExportArtifactCache(tmp_path, max_bytes=100), name, b"data")
+    (tmp_path / "leftover.tmp").write_bytes(b"partial")
+    an_hour_ago = time.time() - 3601
+    os.utime(tmp_path / "leftover.tmp", (an_hour_ago, an_hour_ago))
+    # Another worker is still rendering this one
+    (tmp_path / "rendering.tmp").write_bytes(b"partial")
+
+    cache = ExportArtifactCache(tmp_path, max_bytes=100)
+
+    assert not (tmp_path / "leftover.tmp").exists()
+    assert (tmp_path / "rendering.tmp").exists()
+    assert cache.get(name).read_bytes() == b"data"
+    cache.invalidate_post("p1")
+    assert cache.get(name) is None
+    assert [path.name for path in tmp_path.iterdir()] == ["rendering.tmp"]
+
+
+def test_workers_sharing_a_directory_keep_it_within_one_limit(tmp_path):
+    first, second = ExportArtifactCache(tmp_path, max_bytes=25), ExportArtifactCache(tmp_path, max_bytes=25)
+    a, b, c = (ExportArtifactCache.artifact_name(post_id, "pdf", ("v1", 0)) for post_id in ["a", "b", "c"])
+
+    admit_bytes(first, a, b"x" * 10)
+    admit_bytes(second, b, b"x" * 10)
+    admit_bytes(first, c, b"x" * 10)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([b, c])
+    assert second.get(c).read_bytes() == b"x" * 10
+    assert first.stats()["bytes"] == second.stats()["bytes"] == 20
+
+
+def test_etag_matching():
+    etag = ExportArtifactCache.etag(ExportArtifactCache.artifact_name("p1", "pdf", ("v1", 0)))
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
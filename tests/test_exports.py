@@ -0,0 +1,59 @@
+import asyncio
+
+from openpyxl import load_workbook
+
+from server import EngagementAnalysis, render_analysis_pdf, stream_csv, user_table_pages, write_xlsx
+
+
+async def iterate(rows):
+    for row in rows:
+        yield row
+
+
+def test_user_tables_are_split_into_numbered_pages():
+    usernames = [f"user{i}" for i in range(8)]
+
+    pages = list(user_table_pages(usernames, rows=2, columns=3))
+
+    assert len(pages) == 2
+    assert pages[0] == [["1. user0", "2. user1", "3. user2"], ["4. user3", "5. user4", "6. user5"]]
+    assert pages[1] == [["7. user6", "8. user7", ""]]
+
+
+def test_pdf_contains_full_user_lists():
+    analysis = EngagementAnalysis(
+        post_id="p1",
+        post_title="Kampanya & <duyuru>",
+        platform="instagram",
+        total_management=3000,
+        total_engaged=1000,
+        engagement_percentage=33.33,
+        engaged_users=[f"user{i}" for i in range(1000)],
+        not_engaged_users=[f"other{i}" for i in range(2000)],
+    )
+
+    pdf = render_analysis_pdf(analysis).getvalue()
+
+    assert pdf.startswith(b"%PDF")
+    assert pdf.count(b"/Type /Page\n") > 10
+
+
+def test_csv_export_streams_rows_with_bom():
+    async def collect():
+        return b"".join([chunk async for chunk in stream_csv(["Kullanıcı", "Etkileşim"], iterate([["ayşe", "Evet"], ["a,b", "Hayır"]]))])
+
+    body = asyncio.run(collect()).decode("utf-8")
+
+    assert body == '\ufeffKullanıcı,Etkileşim\r\nayşe,Evet\r\n"a,b",Hayır\r\n'
+
+
+def test_xlsx_export_writes_all_rows(tmp_path):
+    path = str(tmp_path / "export.xlsx")
+    rows = [[f"user{i}", i % 2] for i in range(5000)]
+
+    asyncio.run(write_xlsx(path, "Analiz", ["Kullanıcı", "Etkileşim"], iterate(rows)))
+
+    sheet = load_workbook(path, read_only=True)["Analiz"]
+    values = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert values[0] == ["Kullanıcı", "Etkileşim"]
+    assert values[1:] == rows
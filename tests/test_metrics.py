@@ -0,0 +1,99 @@
+import asyncio
+
+import server
+from server import (
+    LatencyHistograms,
+    app,
+    parse_pool,
+    request_latency,
+    request_stage_timings,
+    server_timing_header,
+    timed_stage,
+)
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    histogram = LatencyHistograms("demo_seconds", "Demo.", ["route"], [0.1, 1.0])
+    histogram.observe(("/api/a",), 0.05)
+    histogram.observe(("/api/a",), 0.5)
+    histogram.observe(('/api/"b"',), 5.0)
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/api/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/api/a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="/api/a",le="+Inf"} 2' in lines
+    assert 'demo_seconds_sum{route="/api/a"} 0.550000' in lines
+    assert 'demo_seconds_count{route="/api/\\"b\\""} 1' in lines
+
+
+def test_stages_on_parse_pool_threads_reach_the_request_timings():
+    def parse():
+        with timed_stage("parse"):
+            return "done"
+
+    async def request():
+        timings = {}
+        request_stage_timings.set(timings)
+        with timed_stage("mongo_insert"):
+            result = await parse_pool.run(parse)
+        return result, timings
+
+    result, timings = asyncio.run(request())
+
+    assert result == "done"
+    assert set(timings) == {"parse", "mongo_insert"}
+    assert server_timing_header({"parse": 0.0123}, 0.5) == "parse;dur=12.3, total;dur=500.0"
+
+
+def get(path, headers=()):
+    messages = []
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "headers": list(headers),
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+        "http_version": "1.1",
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_middleware_adds_server_timing_and_observes_route():
+    messages = get("/api/")
+
+    headers = dict(messages[0]["headers"])
+    assert messages[0]["status"] == 200
+    assert headers[b"server-timing"].startswith(b"total;dur=")
+    assert request_latency.series[("GET", "/api/", "200")]["count"] >= 1
+
+
+def test_metrics_are_scraped_with_the_static_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape-token")
+
+    scraped = get("/api/metrics", [(b"authorization", b"Bearer scrape-token")])
+    rejected = get("/api/metrics", [(b"authorization", b"Bearer wrong-token")])
+
+    assert scraped[0]["status"] == 200
+    assert b"# TYPE http_request_duration_seconds histogram" in scraped[1]["body"]
+    assert rejected[0]["status"] == 401
+
+
+def test_metrics_are_open_without_a_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", None)
+
+    assert get("/api/metrics")[0]["status"] == 200
@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from server import normalize_username, normalize_username_series, normalize_username_values
+
+TRICKY_USERNAMES = [
+    "cmile.ozdmrr",
+    "@ayse.yilmaz",
+    "Mehmet_Kaya",
+    "fatma demir",
+    "Ali-Ozkan",
+    "BURAK.TWITTER",
+    "  @@selin  medya  ",
+    "İsmail Çelik",
+    "IĞDIR_ığdır",
+    "Straße",
+    "ﬁnn",
+    "ＦＵＬＬ１２３",
+    "émile",
+    "tab\tand\nnewline",
+    "nbsp space em",
+    "emoji😀user",
+    "٣arabic٣digits",
+    "...",
+    "@",
+    "",
+    " ",
+    "0",
+    "nan",
+    "None",
+]
+
+NON_STRING_VALUES = [None, np.nan, pd.NaT, 0, 0.0, 12, 3.5, False, True]
+
+ALPHABET = "abcXYZ019 ._-@\t İıĞğŞşÇçÖöÜüßﬁＦ１é́😀#!$%"
+
+
+def assert_matches_scalar(values):
+    expected = [normalize_username(value) for value in values]
+    actual = normalize_username_series(pd.Series(values, dtype=object)).tolist()
+    assert actual == expected
+
+
+@pytest.mark.parametrize("username", TRICKY_USERNAMES)
+def test_series_matches_scalar_for_tricky_strings(username):
+    assert_matches_scalar([username])
+
+
+def test_series_matches_scalar_for_non_string_cells():
+    assert_matches_scalar(NON_STRING_VALUES)
+
+
+def test_series_matches_scalar_for_random_strings():
+    rng = random.Random(1234)
+    values = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24))) for _ in range(5000)]
+
+    assert_matches_scalar(values)
+
+
+def test_series_normalizes_pandas_na_to_empty():
+    assert normalize_username_series(pd.Series([pd.NA, "X"], dtype=object)).tolist() == ["", "x"]
+
+
+def test_series_keeps_index_and_handles_empty_input():
+    result = normalize_username_series(pd.Series(["A.B", "c"], index=[10, 20]))
+
+    assert result.to_dict() == {10: "ab", 20: "c"}
+    assert normalize_username_series(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_values_drop_usernames_that_normalize_to_empty():
+    values = ["@Ayse", "...", None, "Mehmet Kaya", ""]
+
+    assert normalize_username_values(values) == ["ayse", "mehmetkaya"]
+    assert normalize_username_values(pd.Series(values, dtype=object)) == ["ayse", "mehmetkaya"]
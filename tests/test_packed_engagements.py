@@ -0,0 +1,38 @@
+import asyncio
+
+import numpy as np
+
+from server import UsernameDictionary, pack_uids, unpack_uids
+
+
+def test_packed_uids_round_trip_as_four_bytes_each():
+    uids = np.array([1, 7, 4096, 2**32 - 1], dtype=np.uint32)
+
+    packed = pack_uids(uids)
+
+    assert len(packed) == 4 * len(uids)
+    assert unpack_uids(bytes(packed)).tolist() == uids.tolist()
+
+
+def test_dictionary_serves_known_usernames_from_memory():
+    dictionary = UsernameDictionary()
+    dictionary._remember("ayse", 1)
+    dictionary._remember("mehmet", 2)
+
+    uids = asyncio.run(dictionary.intern(["mehmet", "ayse", "mehmet"]))
+    usernames = asyncio.run(dictionary.usernames([2, 1]))
+
+    assert uids.tolist() == [2, 1, 2]
+    assert usernames == {2: "mehmet", 1: "ayse"}
+
+
+def test_dictionary_cache_is_bounded_in_both_directions():
+    dictionary = UsernameDictionary(max_entries=2)
+    dictionary._remember("ayse", 1)
+    dictionary._remember("mehmet", 2)
+    # Decoding ayse makes mehmet the least recently used pair
+    assert asyncio.run(dictionary.usernames([1])) == {1: "ayse"}
+    dictionary._remember("zeynep", 3)
+
+    assert list(dictionary.uid_by_username) == ["ayse", "zeynep"]
+    assert dictionary.username_by_uid == {1: "ayse", 3: "zeynep"}
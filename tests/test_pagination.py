@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import USER_PROJECTION, decode_cursor, encode_cursor, post_response_row, rows_with_next_cursor, stream_ndjson, username_prefix_filter
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"created_at": datetime(2024, 5, 1, 12, 30), "id": "abc"})
+
+    assert decode_cursor(cursor) == {"created_at": "2024-05-01T12:30:00", "id": "abc"}
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "W10=", ""])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+
+    assert exc_info.value.status_code == 400
+
+
+def test_username_prefix_is_normalized_and_anchored():
+    assert username_prefix_filter(" @Ali.Veli") == {"$regex": "^aliveli"}
+    assert username_prefix_filter("ay$e") == {"$regex": "^aye"}
+
+
+@pytest.mark.parametrize("search", [None, "", "@", " ._ "])
+def test_empty_username_prefix_matches_everyone(search):
+    assert username_prefix_filter(search) is None
+
+
+def test_ndjson_streams_one_row_per_line_in_batches(monkeypatch):
+    monkeypatch.setattr(server, "NDJSON_BATCH_SIZE", 2)
+
+    async def rows():
+        for i in range(3):
+            yield {"username": f"user{i}", "created_at": datetime(2024, 5, 1)}
+
+    async def collect():
+        return [chunk async for chunk in stream_ndjson(rows())]
+
+    chunks = asyncio.run(collect())
+
+    assert len(chunks) == 2
+    assert b"".join(chunks).splitlines() == [
+        b'{"username":"user0","created_at":"2024-05-01T00:00:00"}',
+        b'{"username":"user1","created_at":"2024-05-01T00:00:00"}',
+        b'{"username":"user2","created_at":"2024-05-01T00:00:00"}',
+    ]
+
+
+def test_limited_ndjson_page_ends_with_the_next_cursor():
+    async def rows(count):
+        for i in range(count):
+            yield {"username": f"user{i}", "id": f"id{i}"}
+
+    async def collect(count):
+        return [row async for row in rows_with_next_cursor(rows(count), 2, ["username", "id"])]
+
+    page = asyncio.run(collect(3))
+
+    assert page[:2] == [{"username": "user0", "id": "id0"}, {"username": "user1", "id": "id1"}]
+    assert decode_cursor(page[2]["next_cursor"]) == {"username": "user1", "id": "id1"}
+    # The last page has no cursor line
+    assert asyncio.run(collect(2)) == page[:2]
+
+
+def test_trusted_read_path_keeps_only_model_fields():
+    post = {
+        "id": "p1",
+        "title": "Gönderi",
+        "platform": "x",
+        "post_id": "42",
+        "post_date": datetime(2024, 5, 1),
+        "created_at": datetime(2024, 5, 2),
+        "engagement_version": "v1",
+        "engagement_storage": "packed",
+        "engagement_count": 7,
+    }
+
+    assert post_response_row(post, 7) == {
+        "id": "p1",
+        "title": "Gönderi",
+        "platform": "x",
+        "post_id": "42",
+        "post_date": datetime(2024, 5, 1),
+        "created_at": datetime(2024, 5, 2),
+        "has_engagement_data": True,
+        "engagement_count": 7,
+    }
+    assert USER_PROJECTION == {"_id": 0, "id": 1, "username": 1, "platform": 1, "created_at": 1}
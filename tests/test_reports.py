@@ -0,0 +1,108 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+
+import server
+from server import build_engagement_analysis, build_engagement_report, build_range_report, bucket_starts, rollup_day
+
+
+def test_engagement_report_rates_users_against_their_platform_posts():
+    users = [
+        {"username": "ayse", "platform": "instagram"},
+        {"username": "mehmet", "platform": "instagram"},
+        {"username": "ayse", "platform": "x"},
+    ]
+    posts_per_platform = Counter({"instagram": 2, "x": 1})
+    engaged_counts = Counter({("instagram", "ayse"): 2, ("instagram", "mehmet"): 1, ("x", "outsider"): 1})
+
+    report = build_engagement_report(users, posts_per_platform, engaged_counts)
+
+    assert report == [
+        {"username": "ayse", "platform": "instagram", "engaged_posts": 2, "total_posts": 2, "engagement_rate": 100.0},
+        {"username": "mehmet", "platform": "instagram", "engaged_posts": 1, "total_posts": 2, "engagement_rate": 50.0},
+        {"username": "ayse", "platform": "x", "engaged_posts": 0, "total_posts": 1, "engagement_rate": 0},
+    ]
+
+
+def test_engagement_report_without_posts_has_zero_rates():
+    report = build_engagement_report([{"username": "ali", "platform": "x"}], Counter(), Counter())
+
+    assert report[0]["total_posts"] == 0
+    assert report[0]["engagement_rate"] == 0
+
+
+def test_rollup_day_truncates_to_midnight():
+    assert rollup_day(datetime(2024, 3, 9, 23, 59, 30)) == datetime(2024, 3, 9)
+
+
+def test_engagement_analysis_is_not_capped():
+    post = {"id": "p1", "title": "Gönderi", "platform": "instagram"}
+    roster = [f"user{i:05d}" for i in range(5000)]
+    engaged = set(roster[:1500]) | {"outsider"}
+
+    analysis = build_engagement_analysis(post, roster, engaged)
+
+    assert analysis.total_management == 5000
+    assert analysis.total_engaged == 1500
+    assert analysis.engagement_percentage == 30.0
+    assert analysis.engaged_users == roster[:1500]
+    assert analysis.not_engaged_users == roster[1500:]
+
+
+def test_bucket_starts_cover_range_by_week_and_month():
+    start, end = datetime(2024, 1, 3), datetime(2024, 3, 2)
+
+    weeks = bucket_starts(start, end, "week")
+    months = bucket_starts(start, end, "month")
+
+    assert weeks[0] == datetime(2024, 1, 1)
+    assert weeks[-1] == datetime(2024, 2, 26)
+    assert months == [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)]
+    assert bucket_starts(datetime(2024, 12, 30), datetime(2025, 1, 2), "month") == [datetime(2024, 12, 1), datetime(2025, 1, 1)]
+
+
+def test_range_report_builds_per_user_series():
+    buckets = bucket_starts(datetime(2024, 1, 1), datetime(2024, 1, 15), "week")
+    post_counts = [{"_id": datetime(2024, 1, 1), "posts": 2}, {"_id": datetime(2024, 1, 8), "posts": 1}]
+    rollups = [
+        {"_id": {"username": "ayse", "bucket": datetime(2024, 1, 1)}, "engaged_posts": 1},
+        {"_id": {"username": "ayse", "bucket": datetime(2024, 1, 8)}, "engaged_posts": 1},
+        {"_id": {"username": "outsider", "bucket": datetime(2024, 1, 1)}, "engaged_posts": 1},
+    ]
+
+    report = build_range_report(["ayse", "mehmet"], "x", buckets, post_counts, rollups)
+
+    assert report["buckets"] == ["2024-01-01", "2024-01-08"]
+    assert report["posts_per_bucket"] == [2, 1]
+    assert report["users"][0]["series"] == [1, 1]
+    assert report["users"][0]["engagement_rate"] == 66.67
+    assert report["users"][1]["series"] == [0, 0]
+    assert report["summary"] == {"total_users": 2, "total_posts": 3, "active_users": 1}
+
+
+class FakeRollups:
+    def __init__(self):
+        self.counts = {}
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            key = operation._filter["username"]
+            if key in self.counts or operation._upsert:
+                self.counts[key] = self.counts.get(key, 0) + operation._doc["$inc"]["engaged_posts"]
+
+    async def delete_many(self, query):
+        self.counts = {key: count for key, count in self.counts.items() if count != query["engaged_posts"]}
+
+
+def test_rollup_diffs_of_one_post_applied_out_of_order_settle_at_zero(monkeypatch):
+    rollups = FakeRollups()
+    monkeypatch.setattr(server, "db", SimpleNamespace(engagement_rollups=rollups))
+    day = datetime(2024, 1, 2)
+
+    # The flip that removes ayse again lands before the flip that added her
+    asyncio.run(server.apply_rollup_diff("x", day, [], ["ayse"]))
+    assert rollups.counts == {"ayse": -1}
+    asyncio.run(server.apply_rollup_diff("x", day, ["ayse"], []))
+
+    assert rollups.counts == {}
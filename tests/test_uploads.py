@@ -0,0 +1,141 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pandas as pd
+
+import server
+from server import diff_roster, iter_username_batches, roster_diff_summary
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def test_csv_is_parsed_in_batches():
+    content = pd.DataFrame({"username": [f"user.{i}" for i in range(25)]}).to_csv(index=False).encode("utf-8")
+
+    batches = list(iter_username_batches(io.BytesIO(content), "text/csv", batch_size=10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert batches[0][:2] == ["user0", "user1"]
+
+
+def test_csv_falls_back_to_latin1():
+    content = "isim\nÇağrı Öz\n".encode("cp1254")
+
+    assert list(iter_username_batches(io.BytesIO(content), "text/csv")) == [["arz"]]
+
+
+def test_excel_matches_known_column_and_skips_missing_cells():
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": [1, 2, 3], "kullanici_adi": ["@Ayse.Yilmaz", None, "nan"]}).to_excel(buffer, index=False)
+
+    batches = list(iter_username_batches(io.BytesIO(buffer.getvalue()), XLSX_TYPE))
+
+    assert batches == [["ayseyilmaz"]]
+
+
+def test_roster_readers_match_only_the_active_versions(monkeypatch):
+    versions = {"instagram": "v2", "x": "legacy"}
+
+    async def get_active_roster_version(platform):
+        return versions[platform]
+
+    monkeypatch.setattr(server, "get_active_roster_version", get_active_roster_version)
+
+    assert asyncio.run(server.active_rosters_query("x")) == {"platform": "x", "upload_version": "legacy"}
+    assert asyncio.run(server.active_rosters_query()) == {"$or": [
+        {"platform": "instagram", "upload_version": "v2"},
+        {"platform": "x", "upload_version": "legacy"},
+    ]}
+
+
+class FakeJobs:
+    def __init__(self):
+        self.documents = {}
+
+    async def insert_one(self, document):
+        self.documents[document["id"]] = dict(document)
+
+    async def update_one(self, query, update):
+        self.documents[query["id"]].update(update["$set"])
+
+    async def find_one(self, query, projection=None):
+        return self.documents.get(query["id"])
+
+
+def test_upload_job_progress_is_read_back_from_the_store(monkeypatch):
+    jobs = FakeJobs()
+    monkeypatch.setattr(server, "db", SimpleNamespace(upload_jobs=jobs))
+
+    async def run():
+        job = server.UploadJob(kind="users")
+        await jobs.insert_one(job.dict())
+        await job.advance(phase="parsing", rows_parsed=10)
+        # Another worker only has the job id
+        return await server.load_upload_job(job.id)
+
+    stored = asyncio.run(run())
+
+    assert stored.phase == "parsing"
+    assert stored.rows_parsed == 10
+    assert not stored.finished
+    assert asyncio.run(server.load_upload_job("missing")) is None
+
+
+def test_roster_diff_keeps_upload_order_for_added_and_sorts_removed():
+    uploaded = dict.fromkeys(["zeynep", "ayse", "can", "ayse"])
+
+    added, removed = diff_roster(uploaded, {"ayse", "mehmet", "burak"})
+
+    assert added == ["zeynep", "can"]
+    assert removed == ["burak", "mehmet"]
+    assert roster_diff_summary(uploaded, added, removed) == {
+        "added": 2,
+        "removed": 2,
+        "unchanged": 1,
+        "added_sample": ["zeynep", "can"],
+        "removed_sample": ["burak", "mehmet"],
+    }
+
+
+class FakeUsers:
+    def __init__(self, rows):
+        self.rows = rows
+        self.writes = []
+
+    async def find(self, query, projection):
+        for row in self.rows:
+            if row["upload_version"] == query["upload_version"]:
+                yield row
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+
+
+def test_sync_recomputes_its_diff_when_a_replace_upload_lands(monkeypatch):
+    users = FakeUsers([{"username": "ayse", "upload_version": "v1"}, {"username": "can", "upload_version": "v2"}])
+    # The replace upload flips v1 to v2 between the sync's diff and its write
+    versions = iter(["v1", "v2", "v2", "v2", "v2"])
+    bumped = []
+
+    async def active_roster_filter(platform):
+        return {"platform": platform, "upload_version": next(versions)}
+
+    async def stream_upload_usernames(file):
+        yield ["ayse", "mehmet"]
+
+    async def bump_roster_version(platform):
+        bumped.append(platform)
+
+    monkeypatch.setattr(server, "db", SimpleNamespace(users=users))
+    monkeypatch.setattr(server, "active_roster_filter", active_roster_filter)
+    monkeypatch.setattr(server, "stream_upload_usernames", stream_upload_usernames)
+    monkeypatch.setattr(server, "bump_roster_version", bump_roster_version)
+
+    result = asyncio.run(server.sync_user_upload("x", SimpleNamespace(filename="roster.csv")))
+
+    assert len(users.writes) == 1
+    assert {operation._doc["upload_version"] for operation in users.writes[0][:-1]} == {"v2"}
+    assert result["diff"]["added_sample"] == ["ayse", "mehmet"]
+    assert result["diff"]["removed_sample"] == ["can"]
+    assert bumped == ["x"]